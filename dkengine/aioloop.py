@@ -0,0 +1,74 @@
+"""The frame loop as an asyncio task, so network and I/O coroutines share its thread.
+
+Each frame has a deadline. Until it comes the frame task sleeps in short slices,
+pumping input, and other coroutines run. asyncio can't interrupt a coroutine,
+so the guarantee is cooperative: background work calls ``await runner.gap()``
+between small steps, and from margin_ms before the deadline gap() parks it
+until the frame has been presented. The margin has to cover the longest step
+a background coroutine takes between gap() calls.
+"""
+import asyncio
+import time
+
+from dkengine.game import FPS
+from dkengine.input import POLL_INTERVAL
+
+
+GAP_MARGIN_MS = 2.0
+
+
+class FrameRunner:
+    def __init__(self, game, margin_ms=GAP_MARGIN_MS):
+        self.game = game
+        self.period = 1.0 / FPS
+        self.margin = margin_ms / 1000
+        self.gap_end = 0.0
+        self.frame_done = None
+        self.coroutines = []
+
+    def spawn(self, coroutine) -> None:
+        # Started as a task alongside the frame loop and cancelled when it ends
+        self.coroutines.append(coroutine)
+
+    def time_left(self) -> float:
+        return self.gap_end - time.perf_counter()
+
+    async def gap(self) -> None:
+        if time.perf_counter() < self.gap_end:
+            await asyncio.sleep(0)
+        else:
+            await self.frame_done.wait()
+
+    async def wait_until(self, deadline) -> None:
+        pump = self.game.input.pump
+        while True:
+            pump()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, POLL_INTERVAL))
+
+    async def run(self, max_frames=None) -> None:
+        game = self.game
+        game.start_gc_scheduler()
+        self.frame_done = asyncio.Event()
+        tasks = [asyncio.create_task(coroutine) for coroutine in self.coroutines]
+        next_frame = time.perf_counter()
+        frames = 0
+        try:
+            while True:
+                deadline = game.input_deadline(next_frame)
+                self.gap_end = deadline - self.margin
+                await self.wait_until(deadline)
+                now = game.run_frame(frames)
+                # Wakes everything parked in gap() for the next frame's gap
+                done, self.frame_done = self.frame_done, asyncio.Event()
+                done.set()
+                next_frame += self.period
+                if next_frame < now:
+                    next_frame = now
+                frames += 1
+                game.frame_presented(frames, max_frames)
+        finally:
+            for task in tasks:
+                task.cancel()
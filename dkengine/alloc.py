@@ -0,0 +1,110 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+
+class AllocationMonitor:
+    """Per-frame, per-subsystem allocation and GC pause accounting (--alloc-report).
+
+    Each section records the net change in live blocks (sys.getallocatedblocks) and
+    the transient peak of traced bytes above the section's starting point, which
+    catches short-lived garbage that the net figure hides. GC passes are timed via
+    gc.callbacks and charged to whichever section was running.
+    """
+
+    def __init__(self, sections=('events', 'update', 'draw', 'idle')):
+        self.sections = {name: [0, 0, 0, 0, 0] for name in sections}  # calls, blocks, peak bytes, worst peak, clean calls
+        self.gc_pauses = {name: [0, 0.0, 0.0] for name in sections}   # collections, total ms, worst ms
+        self.gc_pauses[None] = [0, 0.0, 0.0]
+        self.current = None
+        self.start_blocks = 0
+        self.start_bytes = 0
+        self.gc_start = 0.0
+        self.frames = 0
+        tracemalloc.start()
+        gc.callbacks.append(self.gc_callback)
+
+    def gc_callback(self, phase, info) -> None:
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+        else:
+            pause = (time.perf_counter() - self.gc_start) * 1000
+            stats = self.gc_pauses[self.current]
+            stats[0] += 1
+            stats[1] += pause
+            if pause > stats[2]:
+                stats[2] = pause
+
+    def begin(self, name) -> None:
+        self.current = name
+        tracemalloc.reset_peak()
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+        self.start_blocks = sys.getallocatedblocks()
+
+    def end(self) -> None:
+        blocks = sys.getallocatedblocks() - self.start_blocks
+        peak = tracemalloc.get_traced_memory()[1] - self.start_bytes
+        stats = self.sections[self.current]
+        stats[0] += 1
+        stats[1] += blocks
+        stats[2] += peak
+        if peak > stats[3]:
+            stats[3] = peak
+        if blocks <= 0 and peak <= 0:
+            stats[4] += 1
+        self.current = None
+
+    def end_frame(self) -> None:
+        self.frames += 1
+
+    def close(self) -> None:
+        gc.callbacks.remove(self.gc_callback)
+        tracemalloc.stop()
+
+    def report(self) -> str:
+        lines = [f"allocations over {self.frames} frames",
+                 f"{'section':<8} {'net blocks/call':>16} {'peak B/call':>12} {'worst peak B':>13} {'clean calls':>12}"]
+        for name, (calls, blocks, peak, worst, clean) in self.sections.items():
+            if calls:
+                lines.append(f"{name:<8} {blocks / calls:>16.2f} {peak / calls:>12.1f} {worst:>13} {clean:>6}/{calls:<5}")
+        lines.append(f"{'gc in':<8} {'collections':>16} {'total ms':>12} {'worst ms':>13}")
+        for name, (count, total, worst) in self.gc_pauses.items():
+            if count:
+                lines.append(f"{name or 'other':<8} {count:>16} {total:>12.2f} {worst:>13.2f}")
+        return '\n'.join(lines)
+
+
+class GcScheduler:
+    """Takes automatic collection off the frame's critical path.
+
+    Startup objects are frozen into the permanent generation, automatic GC is
+    disabled, and young generations are collected only in frames that finish with
+    slack to spare. If the game never idles, a collection is forced once pending
+    allocations pass a hard limit so memory stays bounded.
+    """
+
+    def __init__(self, frame_budget_ms, min_slack_ms=4.0, young_threshold=700, hard_limit=20000):
+        self.frame_budget_ms = frame_budget_ms
+        self.min_slack_ms = min_slack_ms
+        self.young_threshold = young_threshold
+        self.hard_limit = hard_limit
+        self.young_collections = 0
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+
+    def idle(self, frame_ms) -> None:
+        pending = gc.get_count()[0]
+        if pending < self.young_threshold:
+            return
+        if frame_ms + self.min_slack_ms <= self.frame_budget_ms or pending >= self.hard_limit:
+            self.young_collections += 1
+            gc.collect(1 if self.young_collections % 10 == 0 else 0)
+
+    def full(self) -> None:
+        gc.collect()
+
+    def close(self) -> None:
+        gc.unfreeze()
+        gc.enable()
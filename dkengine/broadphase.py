@@ -0,0 +1,98 @@
+from bisect import bisect_left
+from operator import attrgetter
+
+
+WINDOW_SCAN_LIMIT = 16
+
+_left_of = attrgetter('left')
+
+
+class SweepAndPrune:
+    """Persistent x-axis sweep-and-prune over Rects (entity colliders, see dkengine.ecs).
+
+    The order survives between frames and is re-sorted incrementally, which stays
+    close to linear because everything moves a few pixels per frame. Only
+    pairs whose x intervals overlap reach the exact Rect test, and that test runs
+    in C over the overlapping slice via Rect.collidelistall().
+    """
+
+    def __init__(self):
+        self.rects = []
+        self.lefts = []
+        self.max_width = 0
+
+    def clear(self) -> None:
+        self.rects = []
+        self.lefts = []
+
+    def insert(self, rect) -> None:
+        self.rects.append(rect)
+        self.lefts.append(rect.left)
+        if rect.width > self.max_width:
+            self.max_width = rect.width
+
+    def prune(self, keep) -> None:
+        # Drops the rects keep(rect) rejects, preserving the order of the rest
+        rects = self.rects
+        write = 0
+        for read in range(len(rects)):
+            rect = rects[read]
+            if keep(rect):
+                rects[write] = rect
+                write += 1
+        if write != len(rects):
+            del rects[write:]
+            del self.lefts[write:]
+            self.refresh()
+
+    def update(self) -> None:
+        # Timsort picks up the runs left over from last frame's order, so re-sorting
+        # an almost ordered list is close to linear and runs in C
+        self.rects.sort(key=_left_of)
+        self.refresh()
+
+    def refresh(self) -> None:
+        rects = self.rects
+        lefts = self.lefts
+        for i in range(len(rects)):
+            lefts[i] = rects[i].left
+
+    def for_each_pair(self, handle) -> None:
+        # Calls handle(a, b) for every overlapping pair, with a no further right than b.
+        # Short windows are scanned in place; long ones (stress densities) hand the
+        # slice to Rect.collidelistall() so the exact tests run in C.
+        rects = self.rects
+        lefts = self.lefts
+        n = len(rects)
+        for i in range(n - 1):
+            rect = rects[i]
+            right = rect.right
+            end = bisect_left(lefts, right, i + 1)
+            if end - i > WINDOW_SCAN_LIMIT:
+                for k in rect.collidelistall(rects[i + 1:end]):
+                    handle(rect, rects[i + 1 + k])
+            else:
+                for j in range(i + 1, end):
+                    if rect.colliderect(rects[j]):
+                        handle(rect, rects[j])
+
+    def pairs(self):
+        found = []
+        self.for_each_pair(lambda a, b: found.append((a, b)))
+        return found
+
+    def first_hit(self, rect, accept=None):
+        # accept(other), if given, is a narrow-phase test run only on rect overlaps
+        lefts = self.lefts
+        rects = self.rects
+        start = bisect_left(lefts, rect.left - self.max_width + 1)
+        end = bisect_left(lefts, rect.right, start)
+        for j in range(start, end):
+            if rect.colliderect(rects[j]) and (accept is None or accept(rects[j])):
+                return rects[j]
+        return None
+
+    def query(self, rect):
+        start = bisect_left(self.lefts, rect.left - self.max_width + 1)
+        end = bisect_left(self.lefts, rect.right, start)
+        return [self.rects[start + k] for k in rect.collidelistall(self.rects[start:end])]
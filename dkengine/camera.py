@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class Camera:
+    """Vertical scrolling window over a world that may be taller than the screen."""
+
+    def __init__(self, width, height, world_height):
+        self.view = pygame.Rect(0, 0, width, height)
+        self.world_height = world_height
+
+    @property
+    def y(self) -> int:
+        return self.view.y
+
+    def set_world_height(self, world_height) -> None:
+        self.world_height = world_height
+        self.clamp()
+
+    def clamp(self) -> None:
+        self.view.y = max(0, min(self.world_height - self.view.height, self.view.y))
+
+    def follow(self, rect) -> None:
+        self.view.y = rect.centery - self.view.height // 2
+        self.clamp()
+
+
+class ChunkedBackground:
+    """Static level layer rendered lazily in horizontal strips and kept in a small LRU.
+
+    Tall stages would need a world-sized surface otherwise; with strips the cost per
+    frame is a couple of blits regardless of how many tiers the stage has. With
+    shift=1 the strips are kept at half resolution for the low-res render path.
+    """
+
+    def __init__(self, width, world_height, render, format_surface, chunk_height=240, max_chunks=8, shift=0):
+        self.width = width
+        self.world_height = world_height
+        self.render = render
+        self.format_surface = format_surface
+        self.chunk_height = chunk_height
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.shift = shift
+        self.half = None
+        self.dest = pygame.Rect(0, 0, 0, 0)
+        self.area = pygame.Rect(0, 0, 0, 0)
+
+    def chunk(self, i):
+        surface = self.chunks.get(i)
+        if surface is None:
+            surface = pygame.Surface((self.width, self.chunk_height), 0, self.format_surface)
+            self.render(surface, pygame.Rect(0, i * self.chunk_height, self.width, self.chunk_height))
+            if self.shift:
+                surface = pygame.transform.scale(
+                    surface, (self.width >> self.shift, self.chunk_height >> self.shift))
+            self.chunks[i] = surface
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(i)
+        return surface
+
+    def half_res(self):
+        if self.half is None:
+            self.half = ChunkedBackground(self.width, self.world_height, self.render, self.format_surface,
+                                          self.chunk_height, self.max_chunks, shift=1)
+        return self.half
+
+    def warm(self, view) -> None:
+        for i in range(view.top // self.chunk_height, (view.bottom - 1) // self.chunk_height + 1):
+            self.chunk(i)
+
+    def blit_view(self, screen, view) -> None:
+        ch = self.chunk_height
+        dest = self.dest
+        dest.x = 0
+        for i in range(view.top // ch, (view.bottom - 1) // ch + 1):
+            dest.y = (i * ch - view.top) >> self.shift
+            screen.blit(self.chunk(i), dest)
+
+    def restore(self, screen, view, rect) -> None:
+        # Re-blits the background under a screen-space rect, for dirty-rect redraws
+        ch = self.chunk_height
+        top = max(0, rect.top)
+        bottom = min(view.height, rect.bottom)
+        dest = self.dest
+        area = self.area
+        for i in range((view.top + top) // ch, (view.top + bottom - 1) // ch + 1):
+            chunk_top = i * ch - view.top
+            y0 = max(top, chunk_top)
+            y1 = min(bottom, chunk_top + ch)
+            if y1 > y0:
+                area.update(rect.x, y0 - chunk_top, rect.width, y1 - y0)
+                dest.update(rect.x, y0, 0, 0)
+                screen.blit(self.chunk(i), dest, area)
@@ -0,0 +1,74 @@
+import argparse
+
+from dkengine.profiles import PROFILES, load_profile
+from dkengine.startup import StartupProfile
+
+
+def main(profile='nes') -> None:
+    # Timed from here: pygame and the engine are imported only once the profile is known
+    startup = StartupProfile()
+    import pygame
+    startup.mark('import pygame')
+    from dkengine import game
+    from dkengine.pacing import QUALITY_NAMES
+    from dkengine.stages import STAGES, stage_index
+    startup.mark('import game modules')
+
+    parser = argparse.ArgumentParser(description=load_profile(profile).CAPTION)
+    parser.add_argument('--profile', choices=PROFILES, default=profile, help="variant constants and palette")
+    parser.add_argument('--stage', choices=STAGES, default=STAGES[0], help="stage to start on")
+    parser.add_argument('--stress', action='store_true',
+                        help="barrel stress mode: rapid throws, non-fatal hits, barrels vs frame time report at exit")
+    parser.add_argument('--max-barrels', type=int, default=game.STRESS_MAX_BARRELS,
+                        help="live barrel cap in stress mode")
+    parser.add_argument('--frames', type=int, default=None, help="quit after this many frames")
+    parser.add_argument('--startup-profile', action='store_true', help="print import and init timings")
+    parser.add_argument('--threaded', action='store_true',
+                        help="run the simulation on its own thread and render from double-buffered snapshots")
+    parser.add_argument('--asyncio', action='store_true',
+                        help="run the frame loop as an asyncio task that other coroutines can share")
+    parser.add_argument('--jitter-report', action='store_true',
+                        help="print simulation tick and present interval statistics at exit")
+    parser.add_argument('--present-delay', type=float, default=0, metavar='MS',
+                        help="sleep this long after each flip to emulate a slow present")
+    parser.add_argument('--alloc-report', action='store_true',
+                        help="print per-frame allocation and GC pause statistics per subsystem at exit")
+    parser.add_argument('--input-report', action='store_true',
+                        help="print input-to-present latency statistics at exit")
+    parser.add_argument('--late-input', action='store_true',
+                        help="sample input as late as the recent frame times allow instead of at frame start")
+    parser.add_argument('--vsync', action='store_true', help="request a vsync-locked present")
+    parser.add_argument('--quality', type=int, choices=range(len(QUALITY_NAMES)), default=None,
+                        help="pin render quality (" + ', '.join(f'{i}={name}' for i, name in enumerate(QUALITY_NAMES))
+                             + "); by default it adapts to frame times")
+    parser.add_argument('--pixel-collision', action='store_true',
+                        help="confirm barrel hits against the sprites' pixel masks, not just their rects")
+    parser.add_argument('--seed', type=int, default=None, help="seed for barrel behaviour (random by default)")
+    parser.add_argument('--telemetry', metavar='DIR', default=None,
+                        help="record deaths, wins and frame times to rotating binary files in DIR")
+    parser.add_argument('--no-music', action='store_true', help="play sound effects only")
+    parser.add_argument('--state-hash', action='store_true',
+                        help="hash the simulation state every frame and print the rolling hash at exit")
+    parser.add_argument('--record', metavar='FILE', default=None,
+                        help="append this run's inputs and keyframes to the replay archive FILE at exit")
+    parser.add_argument('--no-gc-schedule', action='store_true',
+                        help="leave Python's automatic garbage collection on instead of collecting in idle time")
+    args = parser.parse_args()
+
+    dk = game.DonkeyKongGame(args.profile, stage=stage_index(args.stage), stress=args.stress,
+                             max_barrels=args.max_barrels,
+                             startup=startup if args.startup_profile else None,
+                             present_delay_ms=args.present_delay, jitter_report=args.jitter_report,
+                             alloc_report=args.alloc_report, gc_schedule=not args.no_gc_schedule,
+                             late_input=args.late_input, input_report=args.input_report, vsync=args.vsync,
+                             quality=args.quality, pixel_collision=args.pixel_collision, seed=args.seed,
+                             music=not args.no_music, telemetry=args.telemetry, state_hash=args.state_hash,
+                             record=args.record)
+    if args.threaded:
+        dk.run_threaded(max_frames=args.frames)
+    elif args.asyncio:
+        import asyncio
+        from dkengine.aioloop import FrameRunner
+        asyncio.run(FrameRunner(dk).run(max_frames=args.frames))
+    else:
+        dk.run(max_frames=args.frames)
@@ -0,0 +1,98 @@
+"""Entity-component storage: dense column tables run by an ordered list of systems.
+
+Entities are plain ints from World.spawn(). Each kind of entity lives in one
+Table whose columns are its components: a typed array per numeric component
+and a plain list for objects. Removing a row moves the last row into the hole
+to keep the columns dense; ``table.row`` maps an entity back to its current
+row for code that starts from an entity (collision pairs, say).
+
+This is a table-per-kind layout, not a full structure-of-arrays one. Position
+still lives in each entity's Collider (a pygame.Rect, kept in a list column)
+because the broadphase sorts and tests those Rects directly, and systems step
+entities row by row rather than as whole-column operations. Only the
+simulation runs as systems; drawing reads a snapshot outside the World.
+
+Row order is not meaningful. Anything order-sensitive keeps its own order,
+the way the broadphase does.
+"""
+from array import array
+
+import pygame
+
+
+class Collider(pygame.Rect):
+    """A Rect that knows its entity, so broadphase pairs lead back to table rows; -1 once removed."""
+
+    __slots__ = ('entity',)
+
+
+def attached(collider) -> bool:
+    return collider.entity >= 0
+
+
+class Table:
+    def __init__(self, name, **columns):
+        # columns: component name -> array typecode, or None for a list of objects
+        self.name = name
+        self.columns = tuple(columns)
+        for column, typecode in columns.items():
+            setattr(self, column, array(typecode) if typecode else [])
+        self.entity = array('q')
+        self.row = {}
+
+    def __len__(self):
+        return len(self.entity)
+
+    def add(self, entity, *values) -> int:
+        # values in column order
+        row = len(self.entity)
+        self.entity.append(entity)
+        for column, value in zip(self.columns, values):
+            getattr(self, column).append(value)
+        self.row[entity] = row
+        return row
+
+    def remove(self, entity) -> None:
+        row = self.row.pop(entity)
+        last = len(self.entity) - 1
+        if row != last:
+            moved = self.entity[last]
+            self.entity[row] = moved
+            self.row[moved] = row
+            for column in self.columns:
+                values = getattr(self, column)
+                values[row] = values[last]
+        self.entity.pop()
+        for column in self.columns:
+            getattr(self, column).pop()
+
+    def clear(self) -> None:
+        del self.entity[:]
+        self.row.clear()
+        for column in self.columns:
+            del getattr(self, column)[:]
+
+
+class World:
+    def __init__(self):
+        self.next_entity = 0
+        self.tables = {}
+        self.systems = []
+
+    def spawn(self) -> int:
+        entity = self.next_entity
+        self.next_entity += 1
+        return entity
+
+    def table(self, name, **columns):
+        # Also reachable as world.<name>
+        table = self.tables[name] = Table(name, **columns)
+        setattr(self, name, table)
+        return table
+
+    def add_system(self, system) -> None:
+        self.systems.append(system)
+
+    def run(self) -> None:
+        for system in self.systems:
+            system()
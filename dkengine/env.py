@@ -0,0 +1,256 @@
+"""Gym-style environments over headless games, for training agents; needs NumPy.
+
+DonkeyKongEnv wraps one game: reset(seed) and step(action) with the action
+repeated for frame_skip simulation frames. VectorEnv steps a batch of them and
+returns preallocated arrays that are overwritten on every call. Sub-envs that
+finish reset themselves with reset_level(); the observation returned for them
+is already the new episode's and the last one is kept in final_observations.
+With processes > 0 the envs are split across worker processes that write
+straight into shared memory, so a step costs one pipe message per worker.
+"""
+import multiprocessing
+
+import numpy as np
+
+from dkengine.game import HEIGHT, WIDTH, DonkeyKongGame
+from dkengine.input import INPUT_DOWN, INPUT_JUMP, INPUT_LEFT, INPUT_RIGHT, INPUT_UP
+
+# Discrete actions as input words
+ACTIONS = (0, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_JUMP,
+           INPUT_LEFT | INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP)
+
+NEAREST_BARRELS = 8
+PLAYER_FEATURES = 8
+OBS_SIZE = PLAYER_FEATURES + 3 * NEAREST_BARRELS
+# Barrels further than this from the player aren't observed
+BARREL_SIGHT = 192
+
+REWARD_CLIMB = 1 / 64    # per pixel of new height reached
+REWARD_WIN = 10.0
+REWARD_DEATH = -5.0
+REWARD_STEP = -0.001
+
+
+class Observer:
+    """A game's observation vector: player state and goal offset, then the nearest barrels' offsets and directions."""
+
+    def __init__(self, game):
+        self.game = game
+        self.sight = game.probe.copy()
+        self.features = [0.0] * OBS_SIZE
+        self.nearby = []
+
+    def observe(self, out=None):
+        game = self.game
+        players = game.players
+        player = players.collider[0]
+        features = self.features
+        features[0] = player.x / WIDTH
+        features[1] = player.y / game.world_height
+        features[2] = players.vel_y[0] / game.jump_power
+        features[3] = float(players.on_ground[0])
+        features[4] = float(players.on_ladder[0])
+        features[5] = (game.goal.centerx - player.centerx) / WIDTH
+        features[6] = (game.goal.centery - player.centery) / HEIGHT
+        features[7] = game.tier_at(player.bottom) / max(1, len(game.tier_ys) - 1)
+        sight = self.sight
+        sight.update(player.centerx - BARREL_SIGHT, player.centery - BARREL_SIGHT, 2 * BARREL_SIGHT, 2 * BARREL_SIGHT)
+        nearby = self.nearby
+        del nearby[:]
+        cx = player.centerx
+        cy = player.centery
+        for rect in game.broadphase.query(sight):
+            dx = rect.centerx - cx
+            dy = rect.centery - cy
+            nearby.append((dx * dx + dy * dy, dx, dy, rect.entity))
+        nearby.sort()
+        barrels = game.barrels
+        i = PLAYER_FEATURES
+        for n in range(NEAREST_BARRELS):
+            if n < len(nearby):
+                _d, dx, dy, entity = nearby[n]
+                features[i] = dx / BARREL_SIGHT
+                features[i + 1] = dy / BARREL_SIGHT
+                features[i + 2] = barrels.dir[barrels.row[entity]]
+            else:
+                features[i] = features[i + 1] = features[i + 2] = 0.0
+            i += 3
+        if out is None:
+            out = np.empty(OBS_SIZE, dtype=np.float32)
+        out[:] = features
+        return out
+
+
+class DonkeyKongEnv:
+    def __init__(self, stage=0, profile='nes', frame_skip=4, max_episode_steps=2000, pixel_collision=False):
+        self.game = DonkeyKongGame(profile, stage=stage, gc_schedule=False, pixel_collision=pixel_collision,
+                                   seed=0, music=False, headless=True)
+        self.frame_skip = frame_skip
+        self.max_episode_steps = max_episode_steps
+        self.steps = 0
+        self.best_y = 0
+        self.observer = Observer(self.game)
+        self.observe = self.observer.observe
+
+    def reset(self, seed=None, out=None):
+        game = self.game
+        if seed is not None:
+            game.seed = seed
+        # The barrel serials and frame count key the random draws, so they restart too
+        game.frame = 0
+        game.next_barrel_id = 0
+        game.reset_level()
+        self.steps = 0
+        self.best_y = game.players.collider[0].y
+        return self.observe(out)
+
+    def step(self, action, out=None):
+        # Returns (observation, reward, terminated, truncated)
+        game = self.game
+        game.input.word = ACTIONS[action]
+        reward = 0.0
+        for _ in range(self.frame_skip):
+            game.update()
+            if game.game_over or game.win:
+                break
+        y = game.players.collider[0].y
+        if y < self.best_y:
+            reward += (self.best_y - y) * REWARD_CLIMB
+            self.best_y = y
+        reward += REWARD_STEP
+        terminated = game.game_over or game.win
+        if game.win:
+            reward += REWARD_WIN
+        elif game.game_over:
+            reward += REWARD_DEATH
+        self.steps += 1
+        truncated = not terminated and self.steps >= self.max_episode_steps
+        return self.observe(out), reward, terminated, truncated
+
+    def close(self) -> None:
+        self.game.close()
+
+
+class _Batch:
+    # The envs one process steps, writing into rows of the shared output arrays
+    def __init__(self, indices, env_kwargs, arrays):
+        self.indices = indices
+        self.envs = [DonkeyKongEnv(**env_kwargs) for _ in indices]
+        self.observations, self.final_observations, self.rewards, self.terminated, self.truncated, self.actions = arrays
+
+    def reset(self, seeds) -> None:
+        for i, env in zip(self.indices, self.envs):
+            env.reset(seeds[i], self.observations[i])
+
+    def step(self) -> None:
+        observations = self.observations
+        for i, env in zip(self.indices, self.envs):
+            _obs, reward, terminated, truncated = env.step(self.actions[i], observations[i])
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            if terminated or truncated:
+                self.final_observations[i] = observations[i]
+                env.reset(None, observations[i])
+
+    def close(self) -> None:
+        for env in self.envs:
+            env.close()
+
+
+def _views(buffers, num_envs):
+    obs, final, rewards, terminated, truncated, actions = buffers
+    return (np.frombuffer(obs, dtype=np.float32).reshape(num_envs, OBS_SIZE),
+            np.frombuffer(final, dtype=np.float32).reshape(num_envs, OBS_SIZE),
+            np.frombuffer(rewards, dtype=np.float32),
+            np.frombuffer(terminated, dtype=np.bool_),
+            np.frombuffer(truncated, dtype=np.bool_),
+            np.frombuffer(actions, dtype=np.int64))
+
+
+def _worker(conn, indices, env_kwargs, buffers, num_envs) -> None:
+    batch = _Batch(indices, env_kwargs, _views(buffers, num_envs))
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == 'step':
+                batch.step()
+            elif command == 'reset':
+                batch.reset(arg)
+            elif command == 'close':
+                break
+            conn.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        batch.close()
+        conn.close()
+
+
+class VectorEnv:
+    """num_envs DonkeyKongEnvs stepped together; processes=0 keeps them in this process."""
+
+    def __init__(self, num_envs, processes=0, context=None, **env_kwargs):
+        self.num_envs = num_envs
+        self.single_observation_size = OBS_SIZE
+        self.action_count = len(ACTIONS)
+        self.workers = []
+        sizes = (num_envs * OBS_SIZE * 4, num_envs * OBS_SIZE * 4, num_envs * 4, num_envs, num_envs, num_envs * 8)
+        if processes:
+            ctx = multiprocessing.get_context(context)
+            buffers = [ctx.RawArray('b', size) for size in sizes]
+            (self.observations, self.final_observations, self.rewards, self.terminated, self.truncated,
+             self.actions) = _views(buffers, num_envs)
+            for chunk in np.array_split(np.arange(num_envs), min(processes, num_envs)):
+                parent, child = ctx.Pipe()
+                process = ctx.Process(target=_worker, args=(child, chunk.tolist(), env_kwargs, buffers, num_envs),
+                                      daemon=True)
+                process.start()
+                child.close()
+                self.workers.append((process, parent))
+            self.batch = None
+        else:
+            buffers = [bytearray(size) for size in sizes]
+            arrays = _views(buffers, num_envs)
+            (self.observations, self.final_observations, self.rewards, self.terminated, self.truncated,
+             self.actions) = arrays
+            self.batch = _Batch(list(range(num_envs)), env_kwargs, arrays)
+
+    def command(self, command, arg=None) -> None:
+        for _process, conn in self.workers:
+            conn.send((command, arg))
+        for _process, conn in self.workers:
+            conn.recv()
+
+    def reset(self, seed=None):
+        # Sub-env i gets seed + i, or its own random seed when seed is None
+        rng = np.random.default_rng(seed)
+        seeds = [seed + i if seed is not None else int(rng.integers(1 << 62)) for i in range(self.num_envs)]
+        if self.batch:
+            self.batch.reset(seeds)
+        else:
+            self.command('reset', seeds)
+        return self.observations
+
+    def step(self, actions):
+        # Returns (observations, rewards, terminated, truncated); arrays are reused by the next call
+        self.actions[:] = actions
+        if self.batch:
+            self.batch.step()
+        else:
+            self.command('step')
+        return self.observations, self.rewards, self.terminated, self.truncated
+
+    def close(self) -> None:
+        if self.batch:
+            self.batch.close()
+            self.batch = None
+        for process, conn in self.workers:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in self.workers:
+            process.join(timeout=5)
+            conn.close()
+        self.workers = []
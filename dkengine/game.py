@@ -0,0 +1,1040 @@
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import pygame
+
+from dkengine.alloc import AllocationMonitor, GcScheduler
+from dkengine.broadphase import SweepAndPrune
+from dkengine.camera import Camera, ChunkedBackground
+from dkengine.ecs import Collider, World, attached
+from dkengine.input import (INPUT_DOWN, INPUT_JUMP, INPUT_LEFT, INPUT_RESTART, INPUT_RIGHT, INPUT_UP,
+                            InputLatch, key_bits)
+from dkengine.music import STAGE_TUNES
+from dkengine.pacing import (QUALITY_DIRTY_RECTS, QUALITY_LOW_RES, QUALITY_NO_HUD,
+                             QUALITY_RECT_BARRELS, AdaptivePacer)
+from dkengine.profiles import load_profile
+from dkengine.rng import STREAM_LADDER_DROP, stream_key, uniform
+from dkengine.sound import SilentSound, SoundEngine
+from dkengine.sprites import (BARREL_FRAMES, MARIO_CLIMB_FRAMES, MARIO_POSES, PAULINE_FRAMES, SpriteBatch,
+                              build_atlas)
+from dkengine.snapshot import FrameSnapshot, LiveFrame, SnapshotBuffer
+from dkengine.stages import StagePipeline, build_stage
+from dkengine.stress import ScalingStats
+from dkengine.telemetry import TELEMETRY_DEATH, TELEMETRY_HIT, TELEMETRY_WIN, TelemetryRecorder
+from dkengine.timing import IntervalStats
+
+
+# Constants
+WIDTH, HEIGHT = 512, 480  # NES resolution
+FPS = 60
+PLATFORM_HEIGHT = 8
+PLAYER_SIZE = 20
+LADDER_WIDTH = 8
+LADDER_HEIGHT = 56
+BARREL_SIZE = 16
+GRAVITY = 0.5
+# Pixels a barrel drops per frame while falling; fixed, so varying a game's gravity moves only the player
+BARREL_FALL_STEP = int(GRAVITY * 8)
+# Barrels this far outside the view step every BARREL_LOD_STEP frames; past the
+# despawn distance from the camera they are dropped entirely
+BARREL_LOD_MARGIN = HEIGHT
+BARREL_LOD_STEP = 4
+BARREL_DESPAWN_DISTANCE = 4 * HEIGHT
+BARREL_SPAWN_INTERVAL = 120
+# Chance a barrel rolling over a ladder top takes it, per ladder per frame
+BARREL_DROP_CHANCE = 0.12
+# Stress mode: DK throws a volley every frame, hits are counted not fatal
+STRESS_SPAWN_INTERVAL = 1
+STRESS_VOLLEY = 8
+STRESS_MAX_BARRELS = 4000
+STRESS_HUD_INTERVAL = 15
+# --late-input: sample input this long before the frame is due, beyond the slowest recent frame
+LATE_INPUT_MARGIN_MS = 1.5
+LATE_INPUT_WINDOW = 30
+# The simulation steps at a fixed FPS whatever the render rate. Frames that arrive
+# slightly early still step once, and a long stall drops time instead of replaying it
+SIM_SLOP = 0.002
+MAX_SIM_STEPS = 4
+
+# NES Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (188, 24, 24)
+BLUE = (48, 80, 188)
+BROWN = (140, 80, 48)
+YELLOW = (252, 188, 116)
+PINK = (255, 160, 192)
+DK_BROWN = (92, 48, 0)
+SPRITE_PALETTE = {'K': BLACK, 'W': WHITE, 'R': RED, 'b': BLUE, 'B': BROWN, 'Y': YELLOW, 'P': PINK, 'D': DK_BROWN}
+# DK shows his throwing pose this many frames after each barrel
+DK_THROW_FRAMES = 20
+
+
+class DonkeyKongGame:
+    def __init__(self, profile='nes', stage=0, stress=False, max_barrels=STRESS_MAX_BARRELS, startup=None,
+                 present_delay_ms=0, jitter_report=False, alloc_report=False, gc_schedule=True,
+                 late_input=False, input_report=False, vsync=False, quality=None, pixel_collision=False,
+                 seed=None, music=True, telemetry=None, headless=False, state_hash=False, record=None):
+        # Only what the first frame needs; pygame.init() would also bring up the mixer,
+        # joystick and the rest, and audio goes through PyAudio anyway
+        self.startup = startup
+        # A profile name or an already loaded profile module, see dkengine.profiles
+        self.profile = load_profile(profile) if isinstance(profile, str) else profile
+        self.barrel_speed = self.profile.BARREL_SPEED
+        self.player_speed = self.profile.PLAYER_SPEED
+        self.jump_power = self.profile.JUMP_POWER
+        # Per game rather than module constants so dkengine.tuner can vary them
+        self.gravity = GRAVITY
+        self.spawn_interval = BARREL_SPAWN_INTERVAL
+        self.drop_chance = BARREL_DROP_CHANCE
+        # Every random decision is a pure function of (seed, frame, barrel id), see dkengine.rng
+        self.seed = random.getrandbits(64) if seed is None else seed
+        # Headless games simulate only: no window, audio or level backgrounds, and
+        # nothing may call draw(); the AI environments in dkengine.env run this way
+        self.headless = headless
+        if self.profile.SOUND and not headless:
+            self.sound_engine = SoundEngine(startup, self.profile.MUSIC if music else None)
+        else:
+            self.sound_engine = SilentSound()
+        self.mark_startup('audio thread started')
+        if headless:
+            # Still a surface, for the sprite atlas and its collision masks
+            self.screen = pygame.Surface((WIDTH, HEIGHT))
+        else:
+            pygame.display.init()
+            pygame.font.init()
+            self.mark_startup('pygame display/font init')
+            if vsync:
+                # SDL only honours vsync for renderer-backed windows, hence SCALED
+                self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+            else:
+                self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption(self.profile.CAPTION)
+            self.mark_startup('window created')
+
+        self.camera = Camera(WIDTH, HEIGHT, HEIGHT)
+        self.stage_pipeline = StagePipeline(self.load_stage)
+        # The audio thread warms the effect tones for the first stage itself
+        self.apply_stage(self.load_stage(stage, warm_audio=False))
+        self.mark_startup('first stage loaded')
+
+        # Everything that moves is an entity with its components in a table, and
+        # update() runs the systems over them in order; see dkengine.ecs. Positions
+        # stay in the Collider column, and draw() works from snapshot() outside the systems
+        self.world = World()
+        self.players = self.world.table('players', collider=None, vel_y='d', on_ground='b', on_ladder='b',
+                                        facing='b', pose=None, climb_timer='i')
+        # serial numbers barrels in throw order and keys their random draws
+        self.barrels = self.world.table('barrels', collider=None, dir='b', level='i', serial='q')
+        player = Collider(self.start_pos[0], self.start_pos[1], PLAYER_SIZE, PLAYER_SIZE)
+        player.entity = self.world.spawn()
+        self.players.add(player.entity, player, 0.0, False, False, 1, MARIO_POSES[1][0], 0)
+        self.camera.follow(player)
+        self.frame = 0
+        self.next_barrel_id = 0
+        self.dk_throw_timer = 0
+
+        # Set at the end of startup with state_hash; the barrel code marks what it changes
+        self.hasher = None
+        # Colliders of despawned barrels, reused by the next throws
+        self.barrel_pool = []
+        self.broadphase = SweepAndPrune()
+        self.collide_pair_handler = self.collide_pair
+        # Set by collide_pair when it pushes barrels apart
+        self.barrels_pushed = False
+        for system in (self.player_system, self.collision_system, self.spawn_system, self.barrel_system,
+                       self.barrel_collision_system):
+            self.world.add_system(system)
+        self.barrel_timer = 0
+        self.game_over = False
+        self.win = False
+        self.stage_clear_active = False
+        self.attempt_frame = self.frame
+        self.stage_clear_timer = 0
+        self.STAGE_CLEAR_DURATION = 180
+
+        self.stress = stress
+        self.max_barrels = max_barrels
+        self.stress_hits = 0
+        self.stress_stats = ScalingStats()
+        self.frame_ms = 0.0
+        self.stress_hud = None
+
+        # Reused every frame so the hot loop doesn't allocate
+        self.index_hits = []
+        self.probe = pygame.Rect(0, 0, 0, 0)
+        self.draw_rect = pygame.Rect(0, 0, 0, 0)
+        self.visible_barrels = []
+        self.live = LiveFrame()
+        self.fonts = {}
+        self.text_cache = {}
+
+        # Threaded mode: simulation ticks on its own thread and publishes snapshots
+        self.snapshots = None
+        self.sim_thread = None
+        self.sim_running = False
+        self.present_delay_ms = present_delay_ms
+        self.jitter_report = jitter_report
+        self.tick_stats = IntervalStats('simulation tick interval')
+        self.present_stats = IntervalStats('present interval')
+
+        self.input = InputLatch(key_bits(*self.profile.LADDER_KEYS))
+        self.late_input = late_input
+        self.input_report = input_report
+        self.work_ms = array('d', [0.0] * LATE_INPUT_WINDOW)
+        # Fixed-step clock state for run_frame()
+        self.accumulator = 0.0
+        self.last_start = None
+
+        # quality=None lets the pacer choose the render quality; a number pins it
+        self.pacer = AdaptivePacer(1000 / FPS) if quality is None else None
+        self.quality = quality or 0
+        self.low_surface = pygame.Surface((WIDTH // 2, HEIGHT // 2), 0, self.screen)
+        self.atlas = build_atlas(dict(SPRITE_PALETTE, **self.profile.SPRITE_COLORS), self.screen)
+        self.sprite_batches = (SpriteBatch(self.atlas), SpriteBatch(self.atlas.half_res()))
+        # Barrel hits can be confirmed against the sprites' pixel masks after the rect test
+        self.barrel_hit_test = self.pixel_hit if pixel_collision else None
+        self.dirty_prev = []
+        self.dirty_cur = []
+        self.dirty_rects = []
+        self.dirty_sources = []
+        self.dirty_count = -1
+        self.dirty_view_y = 0
+        self.dirty_background = None
+
+        # telemetry is a directory for the recorder's rotating files, see dkengine.telemetry
+        self.telemetry = TelemetryRecorder(telemetry) if telemetry else None
+        self.alloc_monitor = AllocationMonitor() if alloc_report else None
+        if state_hash:
+            # Per-frame hash of the simulation state for replay and determinism checks, see dkengine.statehash
+            from dkengine.statehash import StateHasher
+            self.hasher = StateHasher(self)
+        # record is a replay archive the run is appended to on exit, see dkengine.replay
+        self.recorder = None
+        if record:
+            from dkengine.replay import ReplayRecorder
+            self.recorder = ReplayRecorder(self, record)
+        # Installed when a frame loop starts (start_gc_scheduler), so headless and library
+        # use keep Python's automatic GC
+        self.gc_schedule = gc_schedule
+        self.gc_scheduler = None
+
+    def mark_startup(self, label) -> None:
+        if self.startup:
+            self.startup.mark(label)
+
+    def load_stage(self, index, warm_audio=True):
+        # Runs on the stage-loader thread: geometry, collision index, background and audio
+        stage = build_stage(index, PLATFORM_HEIGHT, LADDER_WIDTH)
+        if self.headless:
+            return stage
+        stage.background = ChunkedBackground(
+            WIDTH, stage.height, lambda surface, area: self.draw_static(surface, stage, area), self.screen)
+        start_view = pygame.Rect(0, stage.start[1] + PLAYER_SIZE // 2 - HEIGHT // 2, WIDTH, HEIGHT)
+        start_view.clamp_ip(pygame.Rect(0, 0, WIDTH, max(HEIGHT, stage.height)))
+        stage.background.warm(start_view)
+        if warm_audio:
+            self.sound_engine.preload(self.sound_engine.EFFECT_TONES)
+        return stage
+
+    def apply_stage(self, stage) -> None:
+        self.stage_index = stage.index
+        self.tier_ys = stage.tier_ys
+        self.sound_engine.play_music(STAGE_TUNES.get(stage.name, 'girders'))
+        self.world_height = stage.height
+        self.camera.set_world_height(stage.height)
+        self.platforms = stage.platforms
+        self.ladders = stage.ladders
+        self.platform_index = stage.platform_index
+        self.ladder_index = stage.ladder_index
+        self.background = stage.background
+        self.drop_rows = stage.drop_rows
+        self.drop_row_ys = stage.drop_row_ys
+        self.nav = stage.nav
+        self.goal = stage.goal
+        self.dk_rect = stage.dk_rect
+        self.start_pos = stage.start
+
+    def draw_static(self, surface, stage, area) -> None:
+        surface.fill(BLACK)
+        for plat in stage.platform_index.query(area):
+            pygame.draw.rect(surface, self.profile.PLATFORM_COLOR, plat.move(-area.x, -area.y))
+        for i in stage.ladder_index.query_indices(area):
+            ladder_obj = stage.ladders[i]
+            color = self.profile.BROKEN_LADDER_COLOR if ladder_obj['broken'] else self.profile.LADDER_COLOR
+            pygame.draw.rect(surface, color, ladder_obj['rect'].move(-area.x, -area.y))
+
+    def close(self) -> None:
+        # Releases the worker threads and files without quit()'s reports and exit
+        self.stage_pipeline.shutdown()
+        self.sound_engine.cleanup()
+        if self.telemetry:
+            self.telemetry.close()
+        if self.recorder:
+            self.recorder.close()
+        if self.gc_scheduler:
+            self.gc_scheduler.close()
+
+    def save_state(self) -> bytes:
+        # The simulation state between frames, see dkengine.savestate
+        from dkengine.savestate import save_state
+        return save_state(self)
+
+    def load_state(self, data) -> None:
+        from dkengine.savestate import load_state
+        load_state(self, data)
+
+    def handle_events(self) -> None:
+        self.input.pump()
+        if self.input.quit_requested:
+            self.quit()
+
+    def quit(self) -> None:
+        if self.sim_thread:
+            self.sim_running = False
+            self.sim_thread.join(timeout=1.0)
+        if self.jitter_report:
+            print(self.tick_stats.report())
+            print(self.present_stats.report())
+            if self.pacer:
+                print(self.pacer.report())
+        if self.input_report:
+            print(self.input.latency.report())
+        self.stage_pipeline.shutdown()
+        self.sound_engine.cleanup()
+        if self.stress:
+            print(self.stress_stats.report())
+        if self.telemetry:
+            self.telemetry.close()
+            print(self.telemetry.report())
+        if self.recorder:
+            self.recorder.close()
+        if self.alloc_monitor:
+            self.alloc_monitor.close()
+            print(self.alloc_monitor.report())
+        if self.gc_scheduler:
+            self.gc_scheduler.close()
+        if self.hasher:
+            print(self.hasher.report())
+        pygame.quit()
+        sys.exit()
+
+    def update(self) -> None:
+        if self.recorder:
+            self.recorder.record(self.input.word)
+        if not self.game_over and not self.win:
+            self.world.run()
+
+        if self.stage_clear_active:
+            self.stage_clear_timer += 1
+            if self.stage_clear_timer > self.STAGE_CLEAR_DURATION:
+                self.apply_stage(self.stage_pipeline.take(self.stage_index + 1))
+                self.reset_level()
+        if self.hasher:
+            self.hasher.commit()
+
+    def player_system(self) -> None:
+        # Input, ladders and physics for every player row, in one pass over the table
+        keys = self.input.word
+        players = self.players
+        hits = self.index_hits
+        platforms = self.platforms
+        for row in range(len(players)):
+            player = players.collider[row]
+            vel_y = players.vel_y[row]
+            on_ground = players.on_ground[row]
+            facing = players.facing[row]
+            climb_timer = players.climb_timer[row]
+
+            dx = 0
+            dy = 0
+            prev_on_ground = on_ground
+
+            on_ladder = False
+            ladder_broken = False
+            for i in self.ladder_index.query_into(player, hits):
+                ladder_obj = self.ladders[i]
+                if player.colliderect(ladder_obj['rect']):
+                    on_ladder = True
+                    ladder_broken = ladder_obj['broken']
+                    break
+
+            if keys & INPUT_LEFT:
+                dx = -self.player_speed
+            if keys & INPUT_RIGHT:
+                dx = self.player_speed
+
+            is_climbing = False
+            if on_ladder and not ladder_broken:
+                if keys & INPUT_UP:
+                    dy = -self.player_speed
+                    is_climbing = True
+                if keys & INPUT_DOWN:
+                    dy = self.player_speed
+                    is_climbing = True
+                vel_y = 0.0
+            else:
+                if on_ground and keys & INPUT_JUMP:
+                    vel_y = -self.jump_power
+                    on_ground = False
+                    self.sound_engine.play_jump_sound()
+
+            if is_climbing:
+                climb_timer -= 1
+                if climb_timer <= 0:
+                    self.sound_engine.play_climb_sound()
+                    climb_timer = 10  # Changed to a fixed value
+            else:
+                climb_timer = 0
+
+            if not (on_ladder and not ladder_broken):
+                vel_y += self.gravity
+                dy += vel_y
+
+            # Each axis is swept against the platform index first, so however far the
+            # player moves it stops at the first platform in its path; the overlap
+            # passes after each sweep still resolve anything overlapped beforehand
+            hit = self.platform_index.sweep(player, dx, 0, hits) if dx else None
+            if hit is None:
+                player.x += dx
+            elif dx > 0:
+                player.right = platforms[hit[2]].left
+            else:
+                player.left = platforms[hit[2]].right
+            for i in self.platform_index.query_into(player, hits):
+                plat = platforms[i]
+                if player.colliderect(plat):
+                    if dx > 0:
+                        player.right = plat.left
+                    if dx < 0:
+                        player.left = plat.right
+
+            # Rects round fractional moves; sweep the step the rect will actually take
+            probe = self.probe
+            probe.y = player.y + dy
+            step = probe.y - player.y
+            # Climbing up a ladder passes through the platform it leads to
+            passing = is_climbing and dy < 0
+            hit = self.platform_index.sweep(player, 0, step, hits) if step and not passing else None
+            on_ground_after_move = False
+            if hit is None:
+                player.y += dy
+            elif step > 0:
+                player.bottom = platforms[hit[2]].top
+                on_ground_after_move = True
+                vel_y = 0.0
+            else:
+                player.top = platforms[hit[2]].bottom
+                vel_y = 0.0
+            for i in self.platform_index.query_into(player, hits):
+                plat = platforms[i]
+                if player.colliderect(plat):
+                    if dy > 0:
+                        player.bottom = plat.top
+                        on_ground_after_move = True
+                        vel_y = 0.0
+                    elif dy < 0 and not passing:
+                        player.top = plat.bottom
+                        vel_y = 0.0
+
+            if not prev_on_ground and on_ground_after_move:
+                self.sound_engine.play_land_sound()
+            on_ground = on_ground_after_move
+
+            if dx:
+                facing = 1 if dx > 0 else -1
+            if is_climbing or (on_ladder and not ladder_broken and not on_ground):
+                pose = MARIO_CLIMB_FRAMES[(player.y // 6) % 2]
+            elif dx or not on_ground:
+                pose = MARIO_POSES[facing][(player.x // 6) % 2 if on_ground else 1]
+            else:
+                pose = MARIO_POSES[facing][0]
+
+            player.x = max(0, min(WIDTH - PLAYER_SIZE, player.x))
+            player.y = max(0, min(self.world_height - PLAYER_SIZE, player.y))
+            self.camera.follow(player)
+
+            players.vel_y[row] = vel_y
+            players.on_ground[row] = on_ground
+            players.on_ladder[row] = on_ladder
+            players.facing[row] = facing
+            players.pose[row] = pose
+            players.climb_timer[row] = climb_timer
+
+    def collision_system(self) -> None:
+        # Players against the goal and against barrels, through the broadphase
+        players = self.players
+        for row in range(len(players)):
+            player = players.collider[row]
+            if player.colliderect(self.goal):
+                self.win = True
+                self.stage_clear_active = True
+                self.stage_clear_timer = 0
+                self.stage_pipeline.preload(self.stage_index + 1)
+                self.sound_engine.play_win_sound()
+                if self.telemetry:
+                    self.record_event(TELEMETRY_WIN)
+                if self.gc_scheduler:
+                    # Nothing moves on the stage clear screen; a good time for a full pass
+                    self.gc_scheduler.full()
+
+            if self.broadphase.first_hit(player, self.barrel_hit_test) is not None:
+                if self.stress:
+                    self.stress_hits += 1
+                else:
+                    self.game_over = True
+                    self.sound_engine.play_mario_hit_sound()
+                if self.telemetry:
+                    self.record_event(TELEMETRY_HIT if self.stress else TELEMETRY_DEATH)
+
+    def spawn_system(self) -> None:
+        self.frame += 1
+        if self.dk_throw_timer:
+            self.dk_throw_timer -= 1
+        self.barrel_timer += 1
+        if self.stress:
+            if self.barrel_timer >= STRESS_SPAWN_INTERVAL:
+                for i in range(min(STRESS_VOLLEY, self.max_barrels - len(self.barrels))):
+                    self.spawn_barrel(i * (BARREL_SIZE + 2))
+                self.barrel_timer = 0
+        elif self.barrel_timer > self.spawn_interval:
+            self.spawn_barrel()
+            self.barrel_timer = 0
+
+    def tier_at(self, y) -> int:
+        # The tier nearest to y, counted up from the bottom one
+        tier_ys = self.tier_ys
+        t = bisect_left(tier_ys, y)
+        if t == len(tier_ys) or (t > 0 and y - tier_ys[t - 1] <= tier_ys[t] - y):
+            t -= 1
+        return len(tier_ys) - 1 - t
+
+    def record_event(self, kind) -> None:
+        player = self.players.collider[0]
+        on_screen = len(self.broadphase.query(self.camera.view)) if kind != TELEMETRY_WIN else 0
+        self.telemetry.record(kind, self.stage_index, self.tier_at(player.bottom), self.frame,
+                              player.x, player.y, on_screen, (self.frame - self.attempt_frame) / FPS)
+
+    def pixel_hit(self, rect) -> bool:
+        player = self.players.collider[0]
+        masks = self.atlas.masks
+        return masks[self.players.pose[0]].overlap(
+            masks[BARREL_FRAMES[(rect.x >> 2) & 3]], (rect.x - player.x, rect.y - player.y)) is not None
+
+    def snapshot(self):
+        view = self.camera.view
+        return FrameSnapshot(
+            self.frame,
+            view.copy(),
+            self.background,
+            tuple(self.players.collider[0]),
+            tuple(tuple(rect) for rect in self.broadphase.query(view)),
+            tuple(self.dk_rect) if view.colliderect(self.dk_rect) else None,
+            tuple(self.goal) if view.colliderect(self.goal) else None,
+            self.game_over,
+            self.stage_clear_active,
+            len(self.barrels),
+            self.frame_ms,
+            self.stress_hits,
+            self.players.pose[0],
+            'dk_throw' if self.dk_throw_timer else 'dk',
+        )
+
+    def refresh_live(self):
+        # Same fields as snapshot(), filled in place from live state for the single-threaded loop
+        view = self.camera.view
+        live = self.live
+        visible = self.visible_barrels
+        del visible[:]
+        broadphase = self.broadphase
+        lefts = broadphase.lefts
+        rects = broadphase.rects
+        start = bisect_left(lefts, view.left - broadphase.max_width + 1)
+        for j in range(start, bisect_left(lefts, view.right, start)):
+            if view.colliderect(rects[j]):
+                visible.append(rects[j])
+        live.frame = self.frame
+        live.view = view
+        live.background = self.background
+        live.player = self.players.collider[0]
+        live.barrels = visible
+        live.dk = self.dk_rect if view.colliderect(self.dk_rect) else None
+        live.goal = self.goal if view.colliderect(self.goal) else None
+        live.game_over = self.game_over
+        live.stage_clear = self.stage_clear_active
+        live.barrel_count = len(self.barrels)
+        live.frame_ms = self.frame_ms
+        live.hits = self.stress_hits
+        live.player_pose = self.players.pose[0]
+        live.dk_pose = 'dk_throw' if self.dk_throw_timer else 'dk'
+        return live
+
+    def draw(self) -> None:
+        self.draw_snapshot(self.refresh_live())
+
+    def blit_text(self, message, size, color, pos=None, center_offset=0) -> None:
+        # Static text is rendered once; pos=None centres it on screen
+        entry = self.text_cache.get(message)
+        if entry is None:
+            font = self.fonts.get(size)
+            if font is None:
+                font = self.fonts[size] = pygame.font.SysFont(None, size)
+            text = font.render(message, True, color)
+            if pos is None:
+                pos = (WIDTH//2 - text.get_width()//2, HEIGHT//2 - text.get_height()//2 + center_offset)
+            entry = self.text_cache[message] = (text, pos)
+        self.screen.blit(entry[0], entry[1])
+
+    def draw_snapshot(self, snap) -> None:
+        quality = self.quality
+        dirty = False
+        if snap.stage_clear:
+            self.screen.fill(BLACK)
+            self.blit_text('STAGE CLEAR!', 60, YELLOW)
+        elif quality >= QUALITY_DIRTY_RECTS and not snap.game_over:
+            self.draw_dirty(snap)
+            dirty = True
+        else:
+            if quality == QUALITY_LOW_RES:
+                self.draw_scene(self.low_surface, snap.background.half_res(), snap, 1)
+                pygame.transform.scale(self.low_surface, self.screen.get_size(), self.screen)
+            else:
+                self.draw_scene(self.screen, snap.background, snap, 0)
+            if quality < QUALITY_NO_HUD:
+                self.blit_text(self.profile.HELP_TEXT, 20, WHITE, (10, 10))
+            if self.stress:
+                # The barrels vs frame time counter is what stress mode is for; it stays at every level
+                self.draw_stress_hud(snap)
+
+            if snap.game_over:
+                self.blit_text('GAME OVER', 48, RED)
+                self.blit_text('Press R to restart', 24, WHITE, center_offset=50)
+
+        if not dirty:
+            self.dirty_count = -1
+            pygame.display.flip()
+        if self.present_delay_ms:
+            # Stand-in for a slow present or vsync wait when measuring jitter
+            time.sleep(self.present_delay_ms / 1000)
+
+    def draw_scene(self, target, background, snap, shift) -> None:
+        # shift=1 draws at half resolution into the low-res surface; background=None
+        # leaves it alone for dirty-rect redraws. Sprites go out in one blits() call.
+        view = snap.view
+        cam_y = view[1]
+        if background is not None:
+            background.blit_view(target, view)
+        batch = self.sprite_batches[shift]
+        batch.clear()
+        if self.quality >= QUALITY_RECT_BARRELS:
+            r = self.draw_rect
+            for barrel in snap.barrels:
+                r.update(barrel[0] >> shift, (barrel[1] - cam_y) >> shift, barrel[2] >> shift, barrel[3] >> shift)
+                target.fill(BROWN, r)
+        else:
+            for barrel in snap.barrels:
+                batch.add(BARREL_FRAMES[(barrel[0] >> 2) & 3], barrel[0] >> shift, (barrel[1] - cam_y) >> shift)
+        dk = snap.dk
+        if dk:
+            batch.add(snap.dk_pose, dk[0] >> shift, (dk[1] - cam_y) >> shift)
+        goal = snap.goal
+        if goal:
+            batch.add(PAULINE_FRAMES[(snap.frame >> 5) & 1], goal[0] >> shift, (goal[1] - cam_y) >> shift)
+        player = snap.player
+        batch.add(snap.player_pose, player[0] >> shift, (player[1] - cam_y) >> shift)
+        batch.draw(target)
+
+    def draw_dirty(self, snap) -> None:
+        # Restores the background under last frame's sprites, draws this frame's and
+        # presents only those rects. A camera move or stage change needs a full frame.
+        view = snap.view
+        prev, cur = self.dirty_prev, self.dirty_cur
+        full = (self.dirty_count < 0 or view[1] != self.dirty_view_y
+                or snap.background is not self.dirty_background)
+        if full:
+            self.draw_scene(self.screen, snap.background, snap, 0)
+        else:
+            for i in range(self.dirty_count):
+                snap.background.restore(self.screen, view, prev[i])
+            self.draw_scene(self.screen, None, snap, 0)
+        if self.stress:
+            self.draw_stress_hud(snap)
+        count = self.sprite_rects(snap, cur)
+        if not full:
+            rects = self.dirty_rects
+            del rects[:]
+            for i in range(self.dirty_count):
+                rects.append(prev[i])
+            for i in range(count):
+                rects.append(cur[i])
+            pygame.display.update(rects)
+        self.dirty_prev, self.dirty_cur = cur, prev
+        self.dirty_count = count
+        self.dirty_view_y = view[1]
+        self.dirty_background = snap.background
+        if full:
+            pygame.display.flip()
+
+    def sprite_rects(self, snap, pool) -> int:
+        # Screen-space rects of everything drawn over the background, into reused Rects
+        cam_y = snap.view[1]
+        sources = self.dirty_sources
+        del sources[:]
+        sources.append(snap.player)
+        sources.extend(snap.barrels)
+        if snap.dk:
+            sources.append(snap.dk)
+        if snap.goal:
+            sources.append(snap.goal)
+        if self.stress and self.stress_hud:
+            text, (x, y) = self.stress_hud
+            sources.append((x, y + cam_y, text.get_width(), text.get_height()))
+        for n in range(len(sources)):
+            if n == len(pool):
+                pool.append(pygame.Rect(0, 0, 0, 0))
+            src = sources[n]
+            pool[n].update(src[0], src[1] - cam_y, src[2], src[3])
+        return len(sources)
+
+    def draw_stress_hud(self, snap) -> None:
+        # Re-rendered a few times a second rather than every frame
+        if self.stress_hud is None or snap.frame % STRESS_HUD_INTERVAL == 0:
+            font = self.fonts.get(20)
+            if font is None:
+                font = self.fonts[20] = pygame.font.SysFont(None, 20)
+            text = font.render(
+                f'BARRELS {snap.barrel_count}  FRAME {snap.frame_ms:.1f} ms  HITS {snap.hits}', True, YELLOW)
+            self.stress_hud = (text, (WIDTH - text.get_width() - 10, 30))
+        self.screen.blit(self.stress_hud[0], self.stress_hud[1])
+
+    def spawn_barrel(self, offset_x=0) -> None:
+        # DK's throws only matter once he is within reach of the camera
+        if abs(self.dk_rect.centery - self.camera.view.centery) >= BARREL_DESPAWN_DISTANCE:
+            return
+        x = self.dk_rect.x + 24 + offset_x
+        y = self.dk_rect.y + 24
+        if self.barrel_pool:
+            # Despawned barrels' colliders are recycled instead of building new Rects
+            collider = self.barrel_pool.pop()
+            collider.update(x, y, BARREL_SIZE, BARREL_SIZE)
+        else:
+            collider = Collider(x, y, BARREL_SIZE, BARREL_SIZE)
+        collider.entity = self.world.spawn()
+        self.barrels.add(collider.entity, collider, 1, 0, self.next_barrel_id)
+        if self.hasher:
+            self.hasher.dirty.add(collider.entity)
+        self.broadphase.insert(collider)
+        self.dk_throw_timer = DK_THROW_FRAMES
+        self.next_barrel_id += 1
+
+    def barrel_system(self) -> None:
+        # One pass over the barrel table: step, then despawn. It runs backwards so a
+        # removal only moves the last row, which has already been stepped, into the hole
+        view = self.camera.view
+        near_top = view.top - BARREL_LOD_MARGIN
+        near_bottom = view.bottom + BARREL_LOD_MARGIN
+        center_y = view.centery
+        world_height = self.world_height
+        barrels = self.barrels
+        colliders = barrels.collider
+        serials = barrels.serial
+        despawned = False
+        for row in range(len(barrels) - 1, -1, -1):
+            rect = colliders[row]
+            if near_top <= rect.y < near_bottom:
+                self.step_barrel(row, 1)
+            elif (self.frame + serials[row]) % BARREL_LOD_STEP == 0:
+                # Off-screen barrels run at reduced fidelity: one coarse step every few frames
+                self.step_barrel(row, BARREL_LOD_STEP)
+            if rect.y >= world_height or abs(rect.centery - center_y) >= BARREL_DESPAWN_DISTANCE:
+                if self.hasher:
+                    self.hasher.remove(rect.entity)
+                barrels.remove(rect.entity)
+                rect.entity = -1
+                self.barrel_pool.append(rect)
+                despawned = True
+        if despawned:
+            self.broadphase.prune(attached)
+
+    def barrel_collision_system(self) -> None:
+        self.broadphase.update()
+        self.barrels_pushed = False
+        self.broadphase.for_each_pair(self.collide_pair_handler)
+        if self.barrels_pushed:
+            # Next frame's player test and queries bisect on lefts before the next update()
+            self.broadphase.update()
+
+    def collide_pair(self, rect_a, rect_b) -> None:
+        # Barrels bounce off each other; they don't stack or hop over one another.
+        # Only barrels rolling on the same surface interact; a falling one passes through
+        if abs(rect_a.bottom - rect_b.bottom) >= 4:
+            return
+        barrels = self.barrels
+        dirs = barrels.dir
+        a = barrels.row[rect_a.entity]
+        b = barrels.row[rect_b.entity]
+        overlap = rect_a.right - rect_b.left
+        if dirs[a] != dirs[b]:
+            # Head-on: bounce apart; a pair already separating is left alone
+            if dirs[a] < 0:
+                return
+            dirs[a] = -1
+            dirs[b] = 1
+            rect_a.x -= overlap // 2
+            rect_b.x += overlap - overlap // 2
+        else:
+            # Same direction: the trailing (or, when exactly stacked, newer) barrel bounces back
+            if rect_a.x == rect_b.x:
+                rear = a if barrels.serial[a] > barrels.serial[b] else b
+            else:
+                rear = a if dirs[a] > 0 else b
+            dirs[rear] = -dirs[rear]
+            if rear == a:
+                rect_a.x -= overlap
+            else:
+                rect_b.x += overlap
+        self.barrels_pushed = True
+        if self.hasher:
+            self.hasher.dirty.add(rect_a.entity)
+            self.hasher.dirty.add(rect_b.entity)
+
+    def step_barrel(self, row, steps) -> None:
+        barrels = self.barrels
+        rect = barrels.collider[row]
+        if self.hasher:
+            self.hasher.dirty.add(rect.entity)
+        rect.x += self.barrel_speed * barrels.dir[row] * steps
+        if rect.x <= 32 or rect.x + BARREL_SIZE >= WIDTH - 32:
+            barrels.dir[row] = -barrels.dir[row]
+            rect.x += self.barrel_speed * barrels.dir[row] * steps
+
+        bottom = rect.bottom
+        row_index = bisect_left(self.drop_row_ys, bottom - 7)
+        while row_index < len(self.drop_rows) and self.drop_rows[row_index][0] < bottom + 8:
+            row_y, target_y, ladder_xs = self.drop_rows[row_index]
+            if self.drop_barrel(row, target_y, ladder_xs, steps == 1):
+                break
+            row_index += 1
+
+        # Falls in whole increments until it overlaps a platform; a coarse LOD step is
+        # one sweep over the full distance rather than one collision test per increment
+        fall = BARREL_FALL_STEP
+        if self.platform_index.collides(rect):
+            return
+        if steps == 1:
+            rect.y += fall
+            return
+        hit = self.platform_index.sweep(rect, 0, fall * steps, self.index_hits)
+        if hit is None:
+            rect.y += fall * steps
+        else:
+            rect.y += min(steps, (self.platforms[hit[2]].top - rect.bottom) // fall + 1) * fall
+
+    def drop_barrel(self, row, target_y, ladder_xs, audible) -> bool:
+        barrels = self.barrels
+        rect = barrels.collider[row]
+        serial = barrels.serial[row]
+        for ladder_x in ladder_xs:
+            if (abs(rect.centerx - ladder_x) < 8
+                    and uniform(self.seed, self.frame, serial,
+                                stream_key(STREAM_LADDER_DROP, ladder_x)) < self.drop_chance):
+                rect.y = target_y
+                barrels.level[row] += 1
+                if audible:
+                    self.sound_engine.play_barrel_break_sound()
+                return True
+        return False
+
+    def reset_level(self) -> None:
+        players = self.players
+        for row in range(len(players)):
+            player = players.collider[row]
+            player.x, player.y = self.start_pos
+            self.camera.follow(player)
+            players.vel_y[row] = 0.0
+            players.on_ground[row] = False
+            players.on_ladder[row] = False
+            players.facing[row] = 1
+            players.pose[row] = MARIO_POSES[1][0]
+            players.climb_timer[row] = 0
+        self.dk_throw_timer = 0
+        for collider in self.barrels.collider:
+            collider.entity = -1
+        self.barrel_pool.extend(self.barrels.collider)
+        self.barrels.clear()
+        self.broadphase.clear()
+        if self.hasher:
+            self.hasher.clear()
+        self.barrel_timer = 0
+        self.game_over = False
+        self.win = False
+        self.stage_clear_active = False
+        self.attempt_frame = self.frame
+
+    def print_startup_profile(self) -> None:
+        # Deferred a moment after the first frame so the audio thread's mark is in
+        print(self.startup.report(), flush=True)
+
+    def check_restart(self) -> None:
+        if self.game_over and self.input.word & INPUT_RESTART:
+            self.reset_level()
+            if self.gc_scheduler:
+                self.gc_scheduler.full()
+
+    def frame_presented(self, frames, max_frames) -> None:
+        self.present_stats.tick()
+        if frames == 1 and self.startup:
+            self.startup.mark('first frame presented')
+            threading.Timer(1.0, self.print_startup_profile).start()
+        if max_frames is not None and frames >= max_frames:
+            self.quit()
+
+    def predicted_work(self) -> float:
+        return (max(self.work_ms) + LATE_INPUT_MARGIN_MS) / 1000
+
+    def start_gc_scheduler(self) -> None:
+        # Only a paced frame loop gives the scheduler idle time to collect in. Startup is
+        # over by then, so everything built during it is frozen out of later collections
+        if self.gc_schedule and not self.gc_scheduler:
+            self.gc_scheduler = GcScheduler(1000 / FPS)
+
+    def run(self, max_frames=None) -> None:
+        self.start_gc_scheduler()
+        period = 1.0 / FPS
+        next_frame = time.perf_counter()
+        frames = 0
+        while True:
+            self.input.wait_until(self.input_deadline(next_frame))
+            now = self.run_frame(frames)
+            next_frame += period
+            if next_frame < now:
+                # Fell behind; don't try to catch up with a burst of frames
+                next_frame = now
+
+            frames += 1
+            self.frame_presented(frames, max_frames)
+
+    def input_deadline(self, next_frame) -> float:
+        # Pacing waits come before input is sampled. With --late-input the wait runs on
+        # until only the slowest recent frame's worth of time is left, so the sampled
+        # input is as fresh as possible when the frame is presented
+        if self.late_input:
+            return next_frame - self.predicted_work()
+        return next_frame
+
+    def run_frame(self, frames) -> float:
+        # Events, fixed simulation steps, draw and the per-frame bookkeeping of one
+        # frame of run() (or dkengine.aioloop); returns the time it was presented
+        monitor = self.alloc_monitor
+        period = 1.0 / FPS
+        start = time.perf_counter()
+        if self.last_start is None:
+            self.last_start = start - period
+        self.accumulator += start - self.last_start
+        self.last_start = start
+        steps = int((self.accumulator + SIM_SLOP) * FPS)
+        if steps > MAX_SIM_STEPS:
+            steps = MAX_SIM_STEPS
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * period
+        if monitor:
+            monitor.begin('events')
+        self.handle_events()
+        if monitor:
+            monitor.end()
+            monitor.begin('update')
+        for _ in range(steps):
+            self.tick_stats.tick()
+            self.input.latch()
+            step_start = time.perf_counter()
+            self.update()
+            self.check_restart()
+            if self.stress:
+                # Per update, as simulation_thread() records it; a frame can run up to MAX_SIM_STEPS
+                self.stress_stats.record(len(self.barrels), (time.perf_counter() - step_start) * 1000)
+        if monitor:
+            monitor.end()
+            monitor.begin('draw')
+        draw_start = time.perf_counter()
+        self.draw()
+        if monitor:
+            monitor.end()
+        now = time.perf_counter()
+        self.input.presented(now)
+        self.frame_ms = (now - start) * 1000
+        self.work_ms[frames % LATE_INPUT_WINDOW] = self.frame_ms
+        if self.pacer:
+            # Render quality can only win back drawing time, so that's all the pacer sees
+            self.quality = self.pacer.record((now - draw_start) * 1000)
+        if self.telemetry:
+            self.telemetry.frame_time(self.frame_ms)
+        if monitor:
+            monitor.begin('idle')
+        if self.gc_scheduler:
+            self.gc_scheduler.idle(self.frame_ms)
+        if monitor:
+            monitor.end()
+            monitor.end_frame()
+        return now
+
+    def run_threaded(self, max_frames=None) -> None:
+        # Rendering and the event pump stay on the main thread, as SDL requires;
+        # update() runs on a fixed 60 Hz clock of its own so a slow present never
+        # delays the next simulation tick
+        self.start_gc_scheduler()
+        self.snapshots = SnapshotBuffer(self.snapshot())
+        self.sim_running = True
+        self.sim_thread = threading.Thread(target=self.simulation_thread, name='simulation', daemon=True)
+        self.sim_thread.start()
+
+        period = 1.0 / FPS
+        next_frame = time.perf_counter()
+        frames = 0
+        while True:
+            self.input.wait_until(next_frame)
+            start = time.perf_counter()
+            self.handle_events()
+            sequence, snap = self.snapshots.read()
+            self.draw_snapshot(snap)
+            now = time.perf_counter()
+            self.input.presented(now, sequence)
+            if self.pacer:
+                # Only rendering competes for this thread's budget
+                self.quality = self.pacer.record((now - start) * 1000)
+            if self.telemetry:
+                self.telemetry.frame_time((now - start) * 1000)
+            next_frame += period
+            if next_frame < now:
+                next_frame = now
+
+            frames += 1
+            self.frame_presented(frames, max_frames)
+
+    def simulation_thread(self) -> None:
+        period = 1.0 / FPS
+        next_tick = time.perf_counter()
+        while self.sim_running:
+            self.tick_stats.tick()
+            start = time.perf_counter()
+            # Latched right before update(); the snapshot published below presents it
+            self.input.latch(self.snapshots.sequence + 1)
+            self.update()
+            self.check_restart()
+            self.frame_ms = (time.perf_counter() - start) * 1000
+            if self.stress:
+                self.stress_stats.record(len(self.barrels), self.frame_ms)
+            self.snapshots.publish(self.snapshot())
+            if self.gc_scheduler:
+                self.gc_scheduler.idle(self.frame_ms)
+
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
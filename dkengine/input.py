@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pygame
+
+from dkengine.timing import SampleStats
+
+
+# Bits of the per-frame input word
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_JUMP = 16
+INPUT_RESTART = 32
+
+
+def key_bits(up='w', down='s'):
+    # up and down are pygame key names without the K_ prefix, as in the profiles
+    return {
+        pygame.K_LEFT: INPUT_LEFT,
+        pygame.K_RIGHT: INPUT_RIGHT,
+        getattr(pygame, 'K_' + up): INPUT_UP,
+        getattr(pygame, 'K_' + down): INPUT_DOWN,
+        pygame.K_SPACE: INPUT_JUMP,
+        pygame.K_r: INPUT_RESTART,
+    }
+
+
+KEY_BITS = key_bits()
+
+EVENT_TYPES = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP)
+POLL_INTERVAL = 0.004
+
+
+class InputLatch:
+    """Key events timestamped as they are pumped and latched into one input word per frame.
+
+    pygame doesn't expose SDL's event timestamps, so events are stamped when
+    pumped; wait_until() pumps while it sleeps to keep that within a few milliseconds
+    of arrival. A key tapped between two latches still shows up for one frame,
+    which polling get_pressed() would miss. Each latch remembers when its oldest
+    event arrived, and the present that shows it records the input-to-present time.
+    """
+
+    def __init__(self, key_bits=KEY_BITS):
+        self.key_bits = key_bits
+        self.held = 0
+        self.tapped = 0
+        self.word = 0
+        self.pending_since = 0.0
+        self.latched_since = 0.0
+        self.latched_tag = 0
+        self.quit_requested = False
+        self.latency = SampleStats('input to present')
+        # Threaded mode pumps on the main thread and latches on the simulation thread
+        self.lock = threading.Lock()
+
+    def pump(self) -> None:
+        # One pump and one drain of the whole queue: clearing after a filtered get() pumps
+        # again and would throw away key events SDL delivered in between, leaving keys held.
+        # Events other than EVENT_TYPES are dropped, which keeps the SDL queue from filling up
+        events = pygame.event.get()
+        if not events:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            for event in events:
+                if event.type not in EVENT_TYPES:
+                    continue
+                if event.type == pygame.QUIT:
+                    self.quit_requested = True
+                    continue
+                bit = self.key_bits.get(event.key, 0)
+                if not bit:
+                    continue
+                if event.type == pygame.KEYDOWN:
+                    self.held |= bit
+                    self.tapped |= bit
+                else:
+                    self.held &= ~bit
+                if not self.pending_since:
+                    self.pending_since = now
+
+    def latch(self, tag=0) -> int:
+        # tag identifies the frame that will present this input (see presented())
+        with self.lock:
+            self.word = self.held | self.tapped
+            self.tapped = 0
+            if self.pending_since:
+                if not self.latched_since:
+                    self.latched_since = self.pending_since
+                    self.latched_tag = tag
+                self.pending_since = 0.0
+        return self.word
+
+    def presented(self, now, tag=0) -> None:
+        if self.latched_since and tag >= self.latched_tag:
+            self.latency.record((now - self.latched_since) * 1000)
+            self.latched_since = 0.0
+
+    def wait_until(self, deadline) -> None:
+        while True:
+            self.pump()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, POLL_INTERVAL))
@@ -0,0 +1,201 @@
+"""Level file format and compiler.
+
+A level is a JSON file in ``dkengine/levels/``::
+
+    {
+        "name": "girders",
+        "platforms": [[x, y, width, steps, step_height, direction], ...],
+        "ladders": [[x, y, height, broken], ...],
+        "dk": [x, y, w, h],
+        "goal": [x, y, w, h],
+        "start": [x, y],
+        "height": h                    (optional world height, defaults to 80 below the last tier)
+    }
+
+A level may instead name a generator, e.g. ``{"name": "tower", "generator": "tower",
+"tiers": 200}``, which is expanded into the form above before compiling.
+
+``compile_level`` turns that into plain tuples (platform rects, ladder table, grid
+index, barrel drop tables and a tier/ladder nav graph). ``load_level`` caches the
+compiled result on disk keyed by a hash of the file contents and compile settings,
+so later startups unpickle a prebuilt blob instead of rebuilding it. The cache lives
+in the user's cache directory (``$DKENGINE_CACHE_DIR``, else ``$XDG_CACHE_HOME`` or
+``~/.cache``, ``%LOCALAPPDATA%`` on Windows), not in the package, which may be read-only.
+"""
+import bisect
+import hashlib
+import json
+import os
+import pickle
+
+import pygame
+
+COMPILER_VERSION = 2
+LEVEL_DIR = os.path.join(os.path.dirname(__file__), 'levels')
+CELL_SIZE = 64
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('DKENGINE_CACHE_DIR')
+    if base:
+        return base
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dkengine', 'levels')
+
+
+CACHE_DIR = default_cache_dir()
+
+
+def level_path(name) -> str:
+    if os.sep in name or name.endswith('.json'):
+        return name
+    return os.path.join(LEVEL_DIR, name + '.json')
+
+
+def generate_tower(data):
+    # Girder tiers alternating slope like the first stage, stacked `tiers` high
+    tiers = data['tiers']
+    platforms = []
+    ladders = []
+    for k in range(tiers):
+        y = 80 + 64 * k
+        if k % 2 == 0:
+            platforms.append([64, y, 384, 8, 2, 1])
+            ladder_row = [(120, False), (248, True), (384, False)]
+        else:
+            platforms.append([32, y, 448, 16, 2, -1])
+            ladder_row = [(64, False), (192, True), (320, False), (448, False)]
+        if k < tiers - 1:
+            ladders.extend([x, y, 64, broken] for x, broken in ladder_row)
+    bottom = 80 + 64 * (tiers - 1)
+    return {
+        'name': data['name'],
+        'platforms': platforms,
+        'ladders': ladders,
+        'dk': [64, 40, 32, 32],
+        'goal': [400, 60, 20, 24],
+        'start': [40, bottom - 20],
+    }
+
+
+GENERATORS = {
+    'tower': generate_tower,
+}
+
+
+def _grid_cells(rects, cell_size):
+    cells = {}
+    for i, (x, y, w, h) in enumerate(rects):
+        for cy in range(y // cell_size, (y + h - 1) // cell_size + 1):
+            for cx in range(x // cell_size, (x + w - 1) // cell_size + 1):
+                cells.setdefault((cx, cy), []).append(i)
+    return cells
+
+
+def compile_level(data, platform_height, ladder_width, cell_size=CELL_SIZE):
+    if 'generator' in data:
+        data = GENERATORS[data['generator']](data)
+
+    platforms = []
+    platform_tiers = []
+    tier_ys = sorted({p[1] for p in data['platforms']})
+    tier_of = {y: t for t, y in enumerate(tier_ys)}
+
+    for x, y, w, steps, step_h, direction in data['platforms']:
+        for s in range(steps):
+            sx = x + (w // steps) * s
+            sy = y + direction * step_h * s
+            sw = w // steps
+            platforms.append((sx, sy, sw, platform_height))
+            platform_tiers.append(tier_of[y])
+
+    ladders = []
+    for x, y, h, broken in data['ladders']:
+        if broken:
+            ladders.append((x, y + h//2, ladder_width, h//2, True))
+        else:
+            ladders.append((x, y, ladder_width, h, False))
+
+    cells = _grid_cells(platforms, cell_size)
+    ladder_cells = _grid_cells([ladder[:4] for ladder in ladders], cell_size)
+
+    def nearest_tier(y):
+        t = bisect.bisect_left(tier_ys, y)
+        if t == len(tier_ys) or (t > 0 and y - tier_ys[t - 1] <= tier_ys[t] - y):
+            return t - 1
+        return t
+
+    # Barrels drop from the row a ladder starts on to the tier it leads to;
+    # each row keeps ladder list order
+    drop_rows = {}
+    for x, y, w, h, broken in ladders:
+        target = nearest_tier(y + h)
+        if not broken and target != nearest_tier(y):
+            drop_rows.setdefault((y, tier_ys[target]), []).append(x + w // 2)
+
+    nav = {t: [] for t in range(len(tier_ys))}
+    for i, (x, y, w, h, broken) in enumerate(ladders):
+        if broken:
+            continue
+        top, bottom = nearest_tier(y), nearest_tier(y + h)
+        if top != bottom:
+            nav[top].append((bottom, i))
+            nav[bottom].append((top, i))
+
+    return {
+        'name': data['name'],
+        'platforms': platforms,
+        'platform_tiers': platform_tiers,
+        'ladders': ladders,
+        'cell_size': cell_size,
+        'cells': cells,
+        'ladder_cells': ladder_cells,
+        'height': data.get('height', tier_ys[-1] + 80),
+        'tier_ys': tier_ys,
+        'drop_rows': [(y, target, xs) for (y, target), xs in sorted(drop_rows.items())],
+        'nav': nav,
+        'dk': tuple(data['dk']),
+        'goal': tuple(data['goal']),
+        'start': tuple(data['start']),
+    }
+
+
+def load_level(name, platform_height, ladder_width, cell_size=CELL_SIZE, use_cache=True, cache_dir=None):
+    with open(level_path(name), 'rb') as f:
+        raw = f.read()
+
+    cache_dir = cache_dir or CACHE_DIR
+    key = hashlib.sha256(raw)
+    key.update(repr((COMPILER_VERSION, platform_height, ladder_width, cell_size)).encode())
+    cache_file = os.path.join(cache_dir, key.hexdigest() + '.bin')
+
+    if use_cache:
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    compiled = compile_level(json.loads(raw), platform_height, ladder_width, cell_size)
+
+    if use_cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = cache_file + '.tmp.%d' % os.getpid()
+            with open(tmp, 'wb') as f:
+                pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"Failed to write level cache: {e}")
+    return compiled
+
+
+def make_platforms(compiled):
+    return [pygame.Rect(p) for p in compiled['platforms']]
+
+
+def make_ladders(compiled):
+    return [{'rect': pygame.Rect(x, y, w, h), 'broken': broken} for x, y, w, h, broken in compiled['ladders']]
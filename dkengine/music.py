@@ -0,0 +1,194 @@
+"""Background music: NES-style channels synthesized a chunk at a time just ahead of playback.
+
+A tune is a set of looping note lists, one per channel. Each channel walks its
+list through a generator and renders straight into a fixed chunk buffer with
+NumPy, so memory stays the same however long the music plays and a chunk costs
+tens of microseconds. NumPy is imported lazily; builds without it play effects only.
+"""
+import itertools
+
+SAMPLE_RATE = 44100
+CHUNK = 512  # samples, about 11.6 ms
+NES_CPU_HZ = 1789773
+# The noise channel's 16 timer periods in CPU cycles; a noise note is an index into this
+NOISE_PERIODS = (4, 8, 16, 32, 64, 96, 128, 160, 202, 254, 380, 508, 762, 1016, 2034, 4068)
+MUSIC_VOLUME = 0.06
+
+# Pitches as MIDI note numbers, None for a rest, lengths in sixteenth notes
+C2, D2, E2, F2, G2, A2, B2 = 36, 38, 40, 41, 43, 45, 47
+C3, D3, E3, F3, G3, A3, B3 = 48, 50, 52, 53, 55, 57, 59
+C4, D4, E4, F4, G4, A4, B4 = 60, 62, 64, 65, 67, 69, 71
+C5, D5, E5, F5, G5, A5 = 72, 74, 76, 77, 79, 81
+R = None
+KICK, SNARE, HAT = 12, 6, 2
+
+TUNES = {
+    # The 25m girder loop: a walking bass under a short two-bar hook
+    'girders': {
+        'tempo': 132,
+        'pulse1': ((C5, 2), (R, 2), (E5, 2), (G5, 2), (F5, 2), (R, 2), (D5, 4),
+                   (E5, 2), (R, 2), (C5, 2), (E5, 2), (D5, 4), (R, 4)),
+        'pulse2': ((E4, 2), (R, 2), (G4, 2), (R, 2), (A4, 2), (R, 2), (F4, 4),
+                   (G4, 2), (R, 2), (E4, 2), (R, 2), (F4, 4), (R, 4)),
+        'triangle': ((C3, 2), (G2, 2), (C3, 2), (G2, 2), (F2, 2), (C3, 2), (F2, 2), (C3, 2),
+                     (C3, 2), (G2, 2), (C3, 2), (G2, 2), (G2, 2), (D3, 2), (G2, 2), (B2, 2)),
+        'noise': ((KICK, 2), (HAT, 2), (SNARE, 2), (HAT, 2)),
+    },
+    # The 100m rivet stage: faster, minor and busier in the bass
+    'rivets': {
+        'tempo': 150,
+        'pulse1': ((A4, 2), (C5, 2), (E5, 2), (C5, 2), (D5, 2), (F5, 2), (E5, 4),
+                   (A4, 2), (C5, 2), (E5, 2), (A5, 2), (G5, 4), (R, 4)),
+        'pulse2': ((E4, 4), (A4, 4), (F4, 4), (E4, 4), (E4, 4), (A4, 4), (B4, 4), (R, 4)),
+        'triangle': ((A2, 1), (R, 1), (A2, 1), (E3, 1), (A2, 1), (R, 1), (G2, 1), (A2, 1),
+                     (F2, 1), (R, 1), (F2, 1), (C3, 1), (E2, 1), (R, 1), (E2, 1), (B2, 1)),
+        'noise': ((KICK, 1), (HAT, 1), (HAT, 1), (HAT, 1), (SNARE, 1), (HAT, 1), (KICK, 1), (HAT, 1)),
+    },
+}
+# Stages without a tune of their own play the girder loop
+STAGE_TUNES = {'rivets': 'rivets'}
+
+# (waveform, volume, duty, decay in seconds or None to hold)
+CHANNELS = {
+    'pulse1': ('square', 0.5, 0.5, 0.35),
+    'pulse2': ('square', 0.3, 0.25, 0.25),
+    'triangle': ('triangle', 0.6, None, None),
+    'noise': ('noise', 0.35, None, 0.06),
+}
+
+_noise_table = None
+
+
+def note_frequency(note) -> float:
+    return 440.0 * 2 ** ((note - 69) / 12)
+
+
+def noise_table(np):
+    # One period of the NES 15-bit noise shift register, as +-1 samples
+    global _noise_table
+    if _noise_table is None:
+        values = []
+        reg = 1
+        for _ in range(32767):
+            values.append(1.0 if reg & 1 else -1.0)
+            reg = (reg >> 1) | (((reg ^ (reg >> 1)) & 1) << 14)
+        _noise_table = np.array(values)
+    return _noise_table
+
+
+def notes(sequence, samples_per_sixteenth):
+    # Loops forever over (note or None for a rest, length in samples)
+    for note, length in itertools.cycle(sequence):
+        yield note, length * samples_per_sixteenth
+
+
+class Channel:
+    def __init__(self, np, waveform, sequence, samples_per_sixteenth, volume, duty, decay, ramp, scratch):
+        self.np = np
+        self.waveform = waveform
+        self.notes = notes(sequence, samples_per_sixteenth)
+        self.volume = volume
+        self.duty = duty
+        self.decay = decay * SAMPLE_RATE if decay else 0
+        self.ramp = ramp
+        self.wave, self.env, self.index, self.mask = scratch
+        self.table = noise_table(np) if waveform == 'noise' else None
+        self.step = 0.0
+        self.left = 0
+        self.age = 0
+        self.phase = 0.0
+
+    def next_note(self) -> None:
+        note, self.left = next(self.notes)
+        self.age = 0
+        if note is None:
+            self.step = 0.0
+        elif self.waveform == 'noise':
+            # Shift-register steps per sample
+            self.step = NES_CPU_HZ / NOISE_PERIODS[note] / SAMPLE_RATE
+        else:
+            self.step = note_frequency(note) / SAMPLE_RATE
+
+    def render(self, out) -> None:
+        # Adds this channel into out, crossing as many note boundaries as the chunk holds
+        start = 0
+        size = len(out)
+        while start < size:
+            if not self.left:
+                self.next_note()
+            n = min(size - start, self.left)
+            if self.step:
+                self.segment(out[start:start + n], n)
+            self.left -= n
+            self.age += n
+            start += n
+
+    def segment(self, out, n) -> None:
+        np = self.np
+        wave = self.wave[:n]
+        np.multiply(self.ramp[:n], self.step, out=wave)
+        wave += self.phase
+        if self.waveform == 'noise':
+            index = self.index[:n]
+            index[:] = wave
+            np.remainder(index, len(self.table), out=index)
+            np.take(self.table, index, out=wave)
+        else:
+            np.remainder(wave, 1.0, out=wave)
+            if self.waveform == 'square':
+                mask = self.mask[:n]
+                np.less(wave, self.duty, out=mask)
+                np.multiply(mask, 2.0, out=wave)
+                wave -= 1.0
+            else:
+                wave -= 0.5
+                np.abs(wave, out=wave)
+                wave *= 4.0
+                wave -= 1.0
+        if self.decay:
+            env = self.env[:n]
+            np.add(self.ramp[:n], self.age, out=env)
+            env *= -1.0 / self.decay
+            env += 1.0
+            np.maximum(env, 0.0, out=env)
+            wave *= env
+        wave *= self.volume
+        out += wave
+        self.phase = (self.phase + n * self.step) % (len(self.table) if self.table is not None else 1.0)
+
+
+class MusicSynth:
+    """Renders a tune into one reused float32 chunk; chunks() yields it forever."""
+
+    def __init__(self, np, tune, chunk=CHUNK, volume=MUSIC_VOLUME):
+        self.np = np
+        self.buffer = np.zeros(chunk, dtype=np.float32)
+        self.volume = volume
+        self.ramp = np.arange(chunk, dtype=np.float64)
+        self.scratch = (np.empty(chunk), np.empty(chunk), np.empty(chunk, dtype=np.int64),
+                        np.empty(chunk, dtype=bool))
+        self.tune = None
+        self.channels = []
+        self.start(tune)
+
+    def start(self, tune) -> None:
+        if tune == self.tune:
+            return
+        self.tune = tune
+        spec = TUNES[tune]
+        samples_per_sixteenth = round(SAMPLE_RATE * 60 / spec['tempo'] / 4)
+        self.channels = [Channel(self.np, waveform, spec[name], samples_per_sixteenth, volume, duty, decay,
+                                 self.ramp, self.scratch)
+                         for name, (waveform, volume, duty, decay) in CHANNELS.items() if name in spec]
+
+    def render(self):
+        out = self.buffer
+        out.fill(0.0)
+        for channel in self.channels:
+            channel.render(out)
+        out *= self.volume
+        return out
+
+    def chunks(self):
+        while True:
+            yield self.render()
@@ -0,0 +1,54 @@
+from array import array
+
+
+# Render quality levels, cheapest last. Each level keeps the savings of the ones
+# before it, except that dirty-rect mode draws at full resolution again: it only
+# touches what moved, which is cheaper than scaling a whole low-res frame up.
+QUALITY_FULL = 0
+QUALITY_RECT_BARRELS = 1
+QUALITY_NO_HUD = 2
+QUALITY_LOW_RES = 3
+QUALITY_DIRTY_RECTS = 4
+QUALITY_NAMES = ['full', 'rect barrels', 'no hud', 'low res', 'dirty rects']
+
+
+class AdaptivePacer:
+    """Steps render quality down when rolling frame times run over budget, and back up with headroom.
+
+    The window has to refill after every change before the next decision, and
+    stepping up needs a much lower mean than stepping down, so the level
+    doesn't oscillate around the budget.
+    """
+
+    def __init__(self, budget_ms, window=30, high=0.9, low=0.5, level=QUALITY_FULL):
+        self.budget_ms = budget_ms
+        self.samples = array('d', [0.0] * window)
+        self.high = high
+        self.low = low
+        self.level = level
+        self.count = 0
+        self.changes = []
+
+    def record(self, frame_ms) -> int:
+        samples = self.samples
+        samples[self.count % len(samples)] = frame_ms
+        self.count += 1
+        if self.count < len(samples):
+            return self.level
+        mean = sum(samples) / len(samples)
+        if mean > self.budget_ms * self.high and self.level < QUALITY_DIRTY_RECTS:
+            self.set_level(self.level + 1, mean)
+        elif mean < self.budget_ms * self.low and self.level > QUALITY_FULL:
+            self.set_level(self.level - 1, mean)
+        return self.level
+
+    def set_level(self, level, mean) -> None:
+        self.changes.append((QUALITY_NAMES[self.level], QUALITY_NAMES[level], mean))
+        self.level = level
+        self.count = 0
+
+    def report(self) -> str:
+        lines = [f"render quality: {QUALITY_NAMES[self.level]} after {len(self.changes)} changes"]
+        for old, new, mean in self.changes:
+            lines.append(f"  {old} -> {new} (rolling mean {mean:.2f} ms)")
+        return '\n'.join(lines)
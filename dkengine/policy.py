@@ -0,0 +1,152 @@
+"""Bot policies evaluated for many games at once; needs NumPy.
+
+A policy maps a (batch, OBS_SIZE) float32 block of observations to action
+indices (into dkengine.env.ACTIONS) in one vectorized call, so its cost is
+shared by every game in the batch instead of being paid per game. The same
+policies act on VectorEnv.observations directly.
+
+BatchController drives running DonkeyKongGames: each tick it gathers every
+live game's observation into a preallocated block, runs the policy once and
+scatters the actions back as held input, which the game's next latch() picks
+up. Once budget_ms has gone by in a tick, whatever has been gathered is
+flushed straight away, so the first games get their actions on time even when
+there are too many to gather in one budget.
+"""
+import time
+
+import numpy as np
+
+from dkengine.env import ACTIONS, OBS_SIZE, Observer
+
+
+class LinearPolicy:
+    def __init__(self, weights, bias=None):
+        # weights: (OBS_SIZE, len(ACTIONS)) scores per action
+        self.weights = np.asarray(weights, dtype=np.float32)
+        if bias is None:
+            bias = np.zeros(self.weights.shape[1])
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.scores = None
+
+    def prepare(self, max_batch) -> None:
+        self.scores = np.empty((max_batch, self.weights.shape[1]), dtype=np.float32)
+
+    def __call__(self, observations, out) -> None:
+        n = len(observations)
+        if self.scores is None or len(self.scores) < n:
+            self.prepare(n)
+        scores = self.scores[:n]
+        np.matmul(observations, self.weights, out=scores)
+        scores += self.bias
+        np.argmax(scores, axis=1, out=out)
+
+
+class MLPPolicy:
+    def __init__(self, layers):
+        # layers: [(weights, bias), ...], tanh between them, action scores out of the last
+        self.layers = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in layers]
+        self.buffers = None
+
+    @classmethod
+    def random(cls, hidden=(64,), seed=0, scale=0.5):
+        rng = np.random.default_rng(seed)
+        sizes = (OBS_SIZE,) + tuple(hidden) + (len(ACTIONS),)
+        return cls([(rng.normal(0.0, scale / np.sqrt(a), (a, b)), np.zeros(b)) for a, b in zip(sizes, sizes[1:])])
+
+    def prepare(self, max_batch) -> None:
+        self.buffers = [np.empty((max_batch, w.shape[1]), dtype=np.float32) for w, _b in self.layers]
+
+    def __call__(self, observations, out) -> None:
+        n = len(observations)
+        if self.buffers is None or len(self.buffers[0]) < n:
+            self.prepare(n)
+        x = observations
+        last = len(self.layers) - 1
+        for i, (weights, bias) in enumerate(self.layers):
+            y = self.buffers[i][:n]
+            np.matmul(x, weights, out=y)
+            y += bias
+            if i < last:
+                np.tanh(y, out=y)
+            x = y
+        np.argmax(x, axis=1, out=out)
+
+
+class TablePolicy:
+    """Looks actions up in an n-dimensional table indexed by a few observation features cut into bins."""
+
+    def __init__(self, table, features, lows, highs):
+        self.table = np.asarray(table, dtype=np.int64)
+        self.features = list(features)
+        self.lows = np.asarray(lows, dtype=np.float32)
+        self.scale = np.asarray(self.table.shape, dtype=np.float32) / (np.asarray(highs, dtype=np.float32) - self.lows)
+        self.top = np.asarray(self.table.shape, dtype=np.int64) - 1
+        self.bins = None
+
+    def prepare(self, max_batch) -> None:
+        self.bins = np.empty((max_batch, len(self.features)), dtype=np.int64)
+
+    def __call__(self, observations, out) -> None:
+        n = len(observations)
+        if self.bins is None or len(self.bins) < n:
+            self.prepare(n)
+        bins = self.bins[:n]
+        bins[:] = (observations[:, self.features] - self.lows) * self.scale
+        np.clip(bins, 0, self.top, out=bins)
+        out[:] = self.table[tuple(bins.T)]
+
+
+class BatchController:
+    def __init__(self, policy, max_batch=256, budget_ms=2.0):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.budget = budget_ms / 1000
+        self.observations = np.zeros((max_batch, OBS_SIZE), dtype=np.float32)
+        self.actions = np.zeros(max_batch, dtype=np.int64)
+        self.observers = []
+        self.pending = []
+        self.batches = 0
+        self.partial = 0
+        policy.prepare(max_batch)
+
+    def add(self, game) -> None:
+        self.observers.append(Observer(game))
+
+    def remove(self, game) -> None:
+        self.observers = [observer for observer in self.observers if observer.game is not game]
+
+    def tick(self) -> int:
+        # Returns how many games were given an action
+        deadline = time.perf_counter() + self.budget
+        observations = self.observations
+        pending = self.pending
+        decided = 0
+        for observer in self.observers:
+            game = observer.game
+            if game.game_over or game.win:
+                game.input.held = 0
+                continue
+            observer.observe(observations[len(pending)])
+            pending.append(game)
+            if len(pending) == self.max_batch:
+                decided += self.flush()
+            elif time.perf_counter() > deadline:
+                self.partial += 1
+                decided += self.flush()
+                deadline = float('inf')
+        if pending:
+            decided += self.flush()
+        return decided
+
+    def flush(self) -> int:
+        n = len(self.pending)
+        actions = self.actions[:n]
+        self.policy(self.observations[:n], actions)
+        for game, action in zip(self.pending, actions.tolist()):
+            game.input.held = ACTIONS[action]
+        del self.pending[:]
+        self.batches += 1
+        return n
+
+    def report(self) -> str:
+        return f"policy: {len(self.observers)} games, {self.batches} batches, {self.partial} flushed by the budget"
@@ -0,0 +1,15 @@
+"""Variant profiles: the constants, palette and text that set one build apart.
+
+Profiles are plain modules imported on demand, so an entry point only pays for
+the one it runs.
+"""
+import importlib
+
+
+PROFILES = ('nes', 'v05', 'space4k', 'rai')
+
+
+def load_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"unknown profile {name!r}, expected one of {', '.join(PROFILES)}")
+    return importlib.import_module(f'dkengine.profiles.{name}')
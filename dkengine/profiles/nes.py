@@ -0,0 +1,16 @@
+CAPTION = "Donkey Kong NES Clone"
+HELP_TEXT = 'Reach Pauline! W/Arrows to move, Space to jump'
+BARREL_SPEED = 3
+PLAYER_SPEED = 3
+JUMP_POWER = 10
+SOUND = True
+# Opening tune, see dkengine.music; stages pick their own after that
+MUSIC = 'girders'
+# pygame key names (K_ suffixes) for climbing up and down
+LADDER_KEYS = ('w', 's')
+
+PLATFORM_COLOR = (188, 24, 24)
+LADDER_COLOR = (48, 80, 188)
+BROKEN_LADDER_COLOR = (120, 160, 255)
+# Overrides for the sprite palette characters in dkengine.sprites
+SPRITE_COLORS = {}
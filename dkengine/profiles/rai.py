@@ -0,0 +1,14 @@
+CAPTION = "Donkey Kong NES Clone (No Media)"
+HELP_TEXT = 'Reach Pauline! Arrows to move, Up/Down for ladders, Space to jump'
+BARREL_SPEED = 3
+PLAYER_SPEED = 3
+JUMP_POWER = 10
+SOUND = False
+# Opening tune, see dkengine.music; stages pick their own after that
+MUSIC = None
+LADDER_KEYS = ('w', 'DOWN')
+
+PLATFORM_COLOR = (188, 24, 24)
+LADDER_COLOR = (48, 80, 188)
+BROKEN_LADDER_COLOR = (120, 160, 255)
+SPRITE_COLORS = {}
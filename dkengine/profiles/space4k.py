@@ -0,0 +1,2 @@
+# space4k shipped as a byte-for-byte copy of v05
+from dkengine.profiles.v05 import *
@@ -0,0 +1,14 @@
+CAPTION = "Donkey Kong NES Clone"
+HELP_TEXT = 'Reach Pauline!'
+BARREL_SPEED = 2
+PLAYER_SPEED = 2
+JUMP_POWER = 8
+SOUND = True
+# Opening tune, see dkengine.music; stages pick their own after that
+MUSIC = 'girders'
+LADDER_KEYS = ('w', 's')
+
+PLATFORM_COLOR = (128, 128, 128)
+LADDER_COLOR = (0, 255, 0)
+BROKEN_LADDER_COLOR = (0, 128, 0)
+SPRITE_COLORS = {'Y': (255, 255, 0), 'B': (128, 64, 0)}
@@ -0,0 +1,159 @@
+"""Software rendering of game frames into NumPy framebuffers, without SDL; needs NumPy.
+
+Frames come out palette-indexed, one uint8 per pixel with ``palette`` mapping
+indices to RGB, and match draw_scene() at full quality pixel for pixel. HUD and
+message text need SDL's fonts and are left out; a stage-clear frame is plain
+black. Each stage's platforms and ladders are drawn once into a world-tall
+layer, so a frame starts as one slice copy of it. Sprites come from the same
+pixel maps as the atlas: DK, Pauline and Mario are composited with masked
+slice copies, and the barrels of every game in a batch go out in a single
+fancy-indexed store.
+
+With shift > 0 frames are 1/2**shift the size each way, every output pixel
+being the full-resolution frame's pixel at (x << shift, y << shift). That
+sampling is exact and cheap, and small frames are what pixel-based agents and
+thumbnails want; full-size frames are bound by memory bandwidth, not by drawing.
+"""
+import numpy as np
+
+from dkengine.game import BLACK, HEIGHT, SPRITE_PALETTE, WIDTH
+from dkengine.profiles import load_profile
+from dkengine.sprites import BARREL_FRAMES, FRAMES, PAULINE_FRAMES
+
+
+class FrameRasterizer:
+    def __init__(self, profile='nes', shift=0):
+        # Games rendered together must share this profile's colours
+        self.shift = shift
+        self.width = WIDTH >> shift
+        self.height = HEIGHT >> shift
+        profile = load_profile(profile) if isinstance(profile, str) else profile
+        colors = [BLACK, profile.PLATFORM_COLOR, profile.LADDER_COLOR, profile.BROKEN_LADDER_COLOR]
+        sprite_palette = dict(SPRITE_PALETTE, **profile.SPRITE_COLORS)
+        chars = {}
+        for ch, color in sprite_palette.items():
+            chars[ch] = len(colors)
+            colors.append(color)
+        self.palette = np.array(colors, dtype=np.uint8)
+        self.layers = {}
+        # name: (palette indices, opaque mask), each the size of the entity's box
+        self.sprites = {}
+        for name, (w, h, rows) in FRAMES.items():
+            pixels = np.zeros((h, w), dtype=np.uint8)
+            mask = np.zeros((h, w), dtype=bool)
+            x0 = (w - len(rows[0])) // 2
+            y0 = h - len(rows)
+            for y, row in enumerate(rows):
+                for x, ch in enumerate(row):
+                    if ch != '.':
+                        pixels[y0 + y, x0 + x] = chars[ch]
+                        mask[y0 + y, x0 + x] = True
+            self.sprites[name] = (pixels, mask)
+        # The barrel frames are quarter turns of one map, so they share an opaque pixel count
+        # and can be stored as (frame, pixel) tables of offsets and colours
+        offsets = [np.nonzero(self.sprites[name][1]) for name in BARREL_FRAMES]
+        self.barrel_dy = np.array([dy for dy, _dx in offsets], dtype=np.int64)
+        self.barrel_dx = np.array([dx for _dy, dx in offsets], dtype=np.int64)
+        self.barrel_colors = np.array([self.sprites[name][0][dy, dx]
+                                       for name, (dy, dx) in zip(BARREL_FRAMES, offsets)])
+
+    def layer(self, game, phase=0):
+        # The stage's static layer, at least a screen tall, drawn in draw_static()'s order.
+        # Downsampled layers keep one contiguous copy per starting row, phase, so a
+        # frame is a plain row slice whatever the camera's y
+        key = (game.stage_index, game.world_height)
+        layers = self.layers.get(key)
+        if layers is None:
+            layer = np.zeros((max(HEIGHT, game.world_height), WIDTH), dtype=np.uint8)
+            for plat in game.platforms:
+                self.fill(layer, plat, 1)
+            for ladder in game.ladders:
+                self.fill(layer, ladder['rect'], 3 if ladder['broken'] else 2)
+            step = 1 << self.shift
+            layers = self.layers[key] = [np.ascontiguousarray(layer[p::step, ::step]) for p in range(step)]
+        return layers[phase]
+
+    @staticmethod
+    def fill(target, rect, index) -> None:
+        x0 = max(0, rect.left)
+        y0 = max(0, rect.top)
+        target[y0:max(y0, rect.bottom), x0:max(x0, rect.right)] = index
+
+    def blit(self, frame, name, x, y) -> None:
+        # x, y at full resolution; the output pixels it covers are the sampled ones from
+        # ceil(x / step) up, reading every step'th sprite pixel
+        pixels, mask = self.sprites[name]
+        h, w = pixels.shape
+        shift = self.shift
+        step = 1 << shift
+        x0 = max(0, -(-x >> shift))
+        y0 = max(0, -(-y >> shift))
+        x1 = min(self.width, -(-(x + w) >> shift))
+        y1 = min(self.height, -(-(y + h) >> shift))
+        if x1 > x0 and y1 > y0:
+            sx = (x0 << shift) - x
+            sy = (y0 << shift) - y
+            area = (slice(sy, sy + (y1 - y0) * step, step), slice(sx, sx + (x1 - x0) * step, step))
+            np.copyto(frame[y0:y1, x0:x1], pixels[area], where=mask[area])
+
+    def render(self, games, out=None):
+        # Returns a (len(games), HEIGHT >> shift, WIDTH >> shift) uint8 batch, into out when given
+        if out is None:
+            out = np.empty((len(games), self.height, self.width), dtype=np.uint8)
+        elif not out.flags.c_contiguous:
+            raise ValueError("render() needs a contiguous output batch")
+        step = 1 << self.shift
+        xs = []
+        ys = []
+        frames = []
+        owners = []
+        for i, game in enumerate(games):
+            frame = out[i]
+            if game.stage_clear_active:
+                frame.fill(0)
+                continue
+            view = game.camera.view
+            cam_y = view.y
+            top = cam_y >> self.shift
+            frame[:] = self.layer(game, cam_y & (step - 1))[top:top + self.height]
+            for rect in game.broadphase.query(view):
+                xs.append(rect.x)
+                ys.append(rect.y - cam_y)
+                frames.append((rect.x >> 2) & 3)
+                owners.append(i)
+        if xs:
+            self.draw_barrels(out, xs, ys, frames, owners)
+        for i, game in enumerate(games):
+            if game.stage_clear_active:
+                continue
+            frame = out[i]
+            view = game.camera.view
+            cam_y = view.y
+            dk = game.dk_rect
+            if view.colliderect(dk):
+                self.blit(frame, 'dk_throw' if game.dk_throw_timer else 'dk', dk.x, dk.y - cam_y)
+            goal = game.goal
+            if view.colliderect(goal):
+                self.blit(frame, PAULINE_FRAMES[(game.frame >> 5) & 1], goal.x, goal.y - cam_y)
+            player = game.players.collider[0]
+            self.blit(frame, game.players.pose[0], player.x, player.y - cam_y)
+        return out
+
+    def draw_barrels(self, out, xs, ys, frames, owners) -> None:
+        # Every opaque pixel of every barrel as a flat index into out, barrels in draw
+        # order so a later barrel's pixels overwrite an earlier one's
+        frames = np.array(frames, dtype=np.int64)
+        px = np.array(xs, dtype=np.int64)[:, None] + self.barrel_dx[frames]
+        py = np.array(ys, dtype=np.int64)[:, None] + self.barrel_dy[frames]
+        visible = (px >= 0) & (px < WIDTH) & (py >= 0) & (py < HEIGHT)
+        shift = self.shift
+        if shift:
+            visible &= ((px | py) & ((1 << shift) - 1)) == 0
+            px >>= shift
+            py >>= shift
+        flat = (np.array(owners, dtype=np.int64)[:, None] * self.height + py) * self.width + px
+        out.reshape(-1)[flat[visible]] = self.barrel_colors[frames][visible]
+
+    def rgb(self, frames, out=None):
+        # Indexed frames to (..., 3) uint8 RGB
+        return np.take(self.palette, frames, axis=0, out=out)
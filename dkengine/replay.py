@@ -0,0 +1,225 @@
+"""Append-only replay archives, read through mmap and seekable to any frame of any run.
+
+An archive file holds many replays back to back. Each replay is one block:
+a header (seed, profile, stage, frame count, keyframe interval and the game
+options that change the simulation), one input byte
+per frame, a keyframe table (frame, offset, length, state hash) and the
+keyframes themselves, saved states (see dkengine.savestate) every ``interval``
+frames from frame 0. Frame k is the state after k updates, so keyframe i is
+frame i * interval and seeking needs no search: restore the keyframe at or
+before the target and re-simulate at most interval - 1 frames of input.
+
+Blocks are written with one O_APPEND write each and their (offset, length) is
+appended to ``<archive>.idx``, so several recorders can share an archive and a
+reader finds replay n with one lookup. If the index is missing it is rebuilt
+by walking the block headers. Readers map both files read-only and hand out
+memoryviews into them; nothing is parsed until it is used.
+"""
+import mmap
+import os
+import struct
+
+from dkengine.rng import MASK64
+from dkengine.savestate import load_state, save_state
+from dkengine.statehash import full_hash
+
+ARCHIVE_MAGIC = b'DKRA'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('<4sHH')
+BLOCK_MAGIC = b'RPLY'
+# magic, block length, seed, profile, stage, keyframes, frames, keyframe interval, flags, stress barrel cap
+BLOCK = struct.Struct('<4sIQ8sHHIIHI')
+# Game options that change the simulation, so a replay's game is built with them
+FLAG_STRESS = 1
+FLAG_PIXEL_COLLISION = 2
+# frame, offset in the block, length, state hash
+KEYFRAME = struct.Struct('<IIIQ')
+# block offset, block length
+INDEX = struct.Struct('<QQ')
+
+KEYFRAME_INTERVAL = 600  # ten seconds of play
+
+
+class ReplayRecorder:
+    """Collects a game's inputs and keyframes; the game calls record() at the top of each update()."""
+
+    def __init__(self, game, path, interval=KEYFRAME_INTERVAL):
+        self.game = game
+        self.path = path
+        self.interval = interval
+        self.start_stage = game.stage_index
+        self.seed = game.seed
+        self.inputs = bytearray()
+        self.keyframes = []
+
+    def record(self, word) -> None:
+        if not self.inputs:
+            self.start_stage = self.game.stage_index
+            self.seed = self.game.seed
+        if len(self.inputs) % self.interval == 0:
+            self.keyframes.append((len(self.inputs), save_state(self.game), full_hash(self.game)))
+        self.inputs.append(word)
+
+    def close(self) -> None:
+        # Appends the run to the archive; a run without frames isn't worth a block
+        if self.inputs:
+            try:
+                game = self.game
+                flags = ((FLAG_STRESS if game.stress else 0)
+                         | (FLAG_PIXEL_COLLISION if game.barrel_hit_test else 0))
+                append_replay(self.path, game.profile.__name__.rsplit('.', 1)[-1], self.start_stage, self.seed,
+                              self.inputs, self.keyframes, self.interval, flags, game.max_barrels)
+            except OSError as e:
+                print(f"Replay write failed: {e}")
+        self.inputs = bytearray()
+        self.keyframes = []
+
+
+def append_replay(path, profile, stage, seed, inputs, keyframes, interval, flags=0, max_barrels=0) -> None:
+    offset = BLOCK.size + len(inputs) + len(keyframes) * KEYFRAME.size
+    table = []
+    for frame, state, state_hash in keyframes:
+        table.append(KEYFRAME.pack(frame, offset, len(state), state_hash))
+        offset += len(state)
+    header = BLOCK.pack(BLOCK_MAGIC, offset, seed & MASK64, profile.encode()[:8], stage, len(keyframes),
+                        len(inputs), interval, flags, max_barrels)
+    block = b''.join([header, bytes(inputs)] + table + [state for _frame, state, _hash in keyframes])
+    try:
+        # Whoever creates the archive writes its header; O_EXCL keeps that to one writer
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        pass
+    else:
+        os.write(fd, ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0))
+        os.close(fd)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        os.write(fd, block)
+        end = os.lseek(fd, 0, os.SEEK_CUR)
+    finally:
+        os.close(fd)
+    fd = os.open(path + '.idx', os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, INDEX.pack(end - len(block), len(block)))
+    finally:
+        os.close(fd)
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Replay:
+    def __init__(self, data, offset):
+        # data: the archive's mmap; offset: where this replay's block starts
+        (magic, self.length, self.seed, profile, self.stage, self.keyframe_count, self.frames,
+         self.interval, self.flags, self.max_barrels) = BLOCK.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"no replay block at offset {offset}")
+        self.profile = profile.rstrip(b'\0').decode()
+        self.data = data
+        self.offset = offset
+
+    @property
+    def inputs(self):
+        # One input word per frame, straight out of the mapping
+        start = self.offset + BLOCK.size
+        return memoryview(self.data)[start:start + self.frames]
+
+    def keyframe(self, i):
+        # (frame, state as a memoryview, state hash)
+        frame, offset, length, state_hash = KEYFRAME.unpack_from(
+            self.data, self.offset + BLOCK.size + self.frames + i * KEYFRAME.size)
+        start = self.offset + offset
+        return frame, memoryview(self.data)[start:start + length], state_hash
+
+    def new_game(self, **kwargs):
+        from dkengine.game import DonkeyKongGame
+        kwargs.setdefault('headless', True)
+        kwargs.setdefault('music', False)
+        kwargs.setdefault('gc_schedule', False)
+        return DonkeyKongGame(self.profile, stage=self.stage, seed=self.seed, stress=bool(self.flags & FLAG_STRESS),
+                              max_barrels=self.max_barrels,
+                              pixel_collision=bool(self.flags & FLAG_PIXEL_COLLISION), **kwargs)
+
+    def seek(self, game, frame, verify=False):
+        # Puts game in the state after `frame` updates: restore the keyframe at or
+        # before it, then re-simulate the inputs in between. Returns the game.
+        if not 0 <= frame <= self.frames:
+            raise ValueError(f"frame {frame} outside 0..{self.frames}")
+        key_frame, state, state_hash = self.keyframe(min(frame // self.interval, self.keyframe_count - 1))
+        load_state(game, state)
+        if verify and full_hash(game) != state_hash:
+            raise ValueError(f"keyframe at frame {key_frame} doesn't restore to its recorded hash")
+        inputs = self.inputs
+        latch = game.input
+        for word in inputs[key_frame:frame]:
+            latch.word = word
+            game.update()
+            game.check_restart()
+        return game
+
+
+class ReplayArchive:
+    def __init__(self, path):
+        self.path = path
+        self.data = _map(path)
+        if self.data is not None:
+            magic, version, _reserved = ARCHIVE_HEADER.unpack_from(self.data)
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+                raise ValueError(f"{path} is not a version {ARCHIVE_VERSION} replay archive")
+        index_path = path + '.idx'
+        self.index = _map(index_path) if os.path.exists(index_path) else None
+        self.offsets = None
+        self.count = 0
+        if self.data is None:
+            pass
+        elif self.index is None:
+            self.offsets = list(self.scan())
+            self.count = len(self.offsets)
+        else:
+            # Entries for blocks appended after the archive was mapped are left out
+            self.count = len(self.index) // INDEX.size
+            end = len(self.data)
+            while self.count and sum(INDEX.unpack_from(self.index, (self.count - 1) * INDEX.size)) > end:
+                self.count -= 1
+
+    def scan(self):
+        # Block offsets found by walking the block headers, for archives without an index
+        data = self.data
+        offset = ARCHIVE_HEADER.size
+        while offset + BLOCK.size <= len(data):
+            magic, length = struct.unpack_from('<4sI', data, offset)
+            if magic != BLOCK_MAGIC or offset + length > len(data):
+                break
+            yield offset
+            offset += length
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        if not -len(self) <= n < len(self):
+            raise IndexError(n)
+        n %= len(self)
+        offset = self.offsets[n] if self.offsets is not None else INDEX.unpack_from(self.index, n * INDEX.size)[0]
+        return Replay(self.data, offset)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def close(self) -> None:
+        for mapping in (self.data, self.index):
+            if mapping is not None:
+                mapping.close()
+        self.data = self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,62 @@
+"""Counter-based random numbers: every draw is a pure function of its key.
+
+A draw is keyed by (seed, frame, entity id, stream) and hashed with chained
+SplitMix64 finalizers, so results don't depend on call order, replay exactly
+from the seed alone, and can be computed for many keys at once with NumPy
+(uniform_many) bit-for-bit the same as the scalar path (uniform).
+"""
+
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+MUL1 = 0xBF58476D1CE4E5B9
+MUL2 = 0x94D049BB133111EB
+TO_UNIT = 2.0 ** -53
+
+# Streams keep unrelated decisions on the same (frame, entity) independent; the
+# low 32 bits are free for a sub-key such as which ladder is being considered
+STREAM_LADDER_DROP = 1
+# The tuner's scripted player; sub-keys are its CLIMBER_* decisions
+STREAM_CLIMBER = 2
+
+
+def stream_key(kind, sub=0):
+    return (kind << 32) | (sub & 0xFFFFFFFF)
+
+
+def mix64(x):
+    z = (x + GOLDEN) & MASK64
+    z = ((z ^ (z >> 30)) * MUL1) & MASK64
+    z = ((z ^ (z >> 27)) * MUL2) & MASK64
+    return z ^ (z >> 31)
+
+
+def hash_key(seed, frame, entity, stream=0):
+    h = mix64(seed & MASK64)
+    h = mix64(h ^ (frame & MASK64))
+    h = mix64(h ^ (entity & MASK64))
+    return mix64(h ^ (stream & MASK64))
+
+
+def uniform(seed, frame, entity, stream=0) -> float:
+    return (hash_key(seed, frame, entity, stream) >> 11) * TO_UNIT
+
+
+def _mix64_array(np, x):
+    z = x + np.uint64(GOLDEN)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MUL1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MUL2)
+    return z ^ (z >> np.uint64(31))
+
+
+def uniform_many(seed, frames, entities, streams=0):
+    """uniform() over broadcast arrays of frames, entities and streams; needs NumPy."""
+    import numpy as np
+    def as_u64(values):
+        # Negative keys wrap modulo 2**64 the same way the scalar path masks them
+        return np.asarray(values, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        h = _mix64_array(np, np.uint64(seed & MASK64))
+        h = _mix64_array(np, h ^ as_u64(frames))
+        h = _mix64_array(np, h ^ as_u64(entities))
+        h = _mix64_array(np, h ^ as_u64(streams))
+    return (h >> np.uint64(11)).astype(np.float64) * TO_UNIT
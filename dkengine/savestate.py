@@ -0,0 +1,126 @@
+"""The whole simulation state of a game as one compact bytes blob, and back.
+
+Saved between frames: counters, timers and flags, the player rows, the barrel
+rows in table order, and the broadphase's order with its cached lefts, which
+the first collision test of the next frame reads before they are refreshed.
+Restoring all of it makes the following frames identical to the original
+run's, as dkengine.statehash can confirm. Rendering, audio, timing and pooled
+objects aren't simulation state and are left as they are.
+"""
+import struct
+
+from dkengine.ecs import Collider
+from dkengine.game import BARREL_SIZE
+from dkengine.rng import MASK64
+from dkengine.sprites import PLAYER_POSES
+
+STATE_MAGIC = b'DKST'
+STATE_VERSION = 1
+# magic, version, stage, seed, frame, next barrel serial, attempt frame, stress hits, barrel timer,
+# dk throw timer, stage clear timer, camera y, flags, players, barrels, broadphase max width
+STATE = struct.Struct('<4sHHQqqqqiiiiBHIH')
+# x, y, vel_y, on_ground, on_ladder, facing, pose, climb_timer
+PLAYER = struct.Struct('<iidbbbBi')
+# x, y, dir, level, serial
+BARREL = struct.Struct('<iibiq')
+# table row, cached left
+SWEEP = struct.Struct('<Ii')
+
+FLAG_GAME_OVER = 1
+FLAG_WIN = 2
+FLAG_STAGE_CLEAR = 4
+
+POSE_IDS = {name: i for i, name in enumerate(PLAYER_POSES)}
+
+
+def save_state(game) -> bytes:
+    players = game.players
+    barrels = game.barrels
+    broadphase = game.broadphase
+    flags = ((FLAG_GAME_OVER if game.game_over else 0) | (FLAG_WIN if game.win else 0)
+             | (FLAG_STAGE_CLEAR if game.stage_clear_active else 0))
+    out = bytearray(STATE.size + len(players) * PLAYER.size + len(barrels) * (BARREL.size + SWEEP.size))
+    STATE.pack_into(out, 0, STATE_MAGIC, STATE_VERSION, game.stage_index, game.seed & MASK64, game.frame,
+                    game.next_barrel_id, game.attempt_frame, game.stress_hits, game.barrel_timer,
+                    game.dk_throw_timer, game.stage_clear_timer, game.camera.view.y, flags, len(players),
+                    len(barrels), broadphase.max_width)
+    offset = STATE.size
+    for row in range(len(players)):
+        rect = players.collider[row]
+        PLAYER.pack_into(out, offset, rect.x, rect.y, players.vel_y[row], players.on_ground[row],
+                         players.on_ladder[row], players.facing[row], POSE_IDS[players.pose[row]],
+                         players.climb_timer[row])
+        offset += PLAYER.size
+    for row in range(len(barrels)):
+        rect = barrels.collider[row]
+        BARREL.pack_into(out, offset, rect.x, rect.y, barrels.dir[row], barrels.level[row], barrels.serial[row])
+        offset += BARREL.size
+    rows = barrels.row
+    for rect, left in zip(broadphase.rects, broadphase.lefts):
+        SWEEP.pack_into(out, offset, rows[rect.entity], left)
+        offset += SWEEP.size
+    return bytes(out)
+
+
+def load_state(game, data) -> None:
+    # data: any buffer, a memoryview into a replay archive's mmap included
+    (magic, version, stage, seed, frame, next_barrel_id, attempt_frame, stress_hits, barrel_timer,
+     dk_throw_timer, stage_clear_timer, camera_y, flags, player_count, barrel_count,
+     max_width) = STATE.unpack_from(data, 0)
+    if magic != STATE_MAGIC or version != STATE_VERSION:
+        raise ValueError(f"not a version {STATE_VERSION} saved state")
+    players = game.players
+    if player_count != len(players):
+        raise ValueError(f"saved state has {player_count} players, the game {len(players)}")
+    if stage != game.stage_index:
+        game.apply_stage(game.stage_pipeline.take(stage))
+    game.seed = seed
+    game.frame = frame
+    game.next_barrel_id = next_barrel_id
+    game.attempt_frame = attempt_frame
+    game.stress_hits = stress_hits
+    game.barrel_timer = barrel_timer
+    game.dk_throw_timer = dk_throw_timer
+    game.stage_clear_timer = stage_clear_timer
+    game.game_over = bool(flags & FLAG_GAME_OVER)
+    game.win = bool(flags & FLAG_WIN)
+    game.stage_clear_active = bool(flags & FLAG_STAGE_CLEAR)
+    game.camera.view.y = camera_y
+    offset = STATE.size
+    for row in range(player_count):
+        x, y, vel_y, on_ground, on_ladder, facing, pose, climb_timer = PLAYER.unpack_from(data, offset)
+        players.collider[row].topleft = (x, y)
+        players.vel_y[row] = vel_y
+        players.on_ground[row] = on_ground
+        players.on_ladder[row] = on_ladder
+        players.facing[row] = facing
+        players.pose[row] = PLAYER_POSES[pose]
+        players.climb_timer[row] = climb_timer
+        offset += PLAYER.size
+    barrels = game.barrels
+    pool = game.barrel_pool
+    for collider in barrels.collider:
+        collider.entity = -1
+    pool.extend(barrels.collider)
+    barrels.clear()
+    for _ in range(barrel_count):
+        x, y, direction, level, serial = BARREL.unpack_from(data, offset)
+        collider = pool.pop() if pool else Collider(0, 0, 0, 0)
+        collider.update(x, y, BARREL_SIZE, BARREL_SIZE)
+        collider.entity = game.world.spawn()
+        barrels.add(collider.entity, collider, direction, level, serial)
+        offset += BARREL.size
+    broadphase = game.broadphase
+    colliders = barrels.collider
+    rects = []
+    lefts = []
+    for _ in range(barrel_count):
+        row, left = SWEEP.unpack_from(data, offset)
+        rects.append(colliders[row])
+        lefts.append(left)
+        offset += SWEEP.size
+    broadphase.rects = rects
+    broadphase.lefts = lefts
+    broadphase.max_width = max_width
+    if game.hasher:
+        game.hasher.reset()
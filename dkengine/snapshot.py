@@ -0,0 +1,47 @@
+import threading
+from collections import namedtuple
+
+# Everything draw needs for one frame, as plain tuples so the render thread never
+# touches live simulation state. Rects are (x, y, w, h) in world coordinates;
+# only barrels inside the view are included. Poses are sprite frame names.
+FrameSnapshot = namedtuple('FrameSnapshot', [
+    'frame', 'view', 'background', 'player', 'barrels', 'dk', 'goal',
+    'game_over', 'stage_clear', 'barrel_count', 'frame_ms', 'hits',
+    'player_pose', 'dk_pose',
+])
+
+
+class SnapshotBuffer:
+    """Double buffer between the simulation (writer) and render (reader) threads.
+
+    The writer fills the back slot and flips; the reader always gets the most
+    recently completed snapshot and never waits on the writer.
+    """
+
+    def __init__(self, initial):
+        self.slots = [initial, initial]
+        self.front = 0
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def publish(self, snapshot) -> None:
+        back = 1 - self.front
+        self.slots[back] = snapshot
+        with self.lock:
+            self.front = back
+            self.sequence += 1
+
+    def read(self):
+        with self.lock:
+            return self.sequence, self.slots[self.front]
+
+
+class LiveFrame:
+    """Mutable stand-in for FrameSnapshot used by the single-threaded loop.
+
+    It is refreshed in place every frame and points at live state (barrels is a
+    reused list of the visible barrel rects), so drawing without a render thread
+    makes no per-frame copies.
+    """
+
+    __slots__ = FrameSnapshot._fields
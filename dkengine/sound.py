@@ -0,0 +1,213 @@
+import math
+import queue
+import threading
+from array import array
+
+SAMPLE_RATE = 44100
+# Effects play one after another; past this much queued audio new ones are dropped,
+# so a burst of sounds (stress mode breaks hundreds of barrels a second) can't leave
+# the audio minutes behind the game
+MAX_BACKLOG_MS = 100
+MAX_BACKLOG_BYTES = SAMPLE_RATE * 4 * MAX_BACKLOG_MS // 1000
+
+
+class SoundEngine:
+    # PyAudio device enumeration is slow, so the backend comes up on its own thread.
+    # Sounds played before it is ready are dropped, and writes go through a queue so
+    # a tone never blocks the game loop. With music the thread streams the tune in
+    # small chunks and mixes queued effects over it instead of writing them directly.
+    def __init__(self, startup=None, music=None):
+        self.stream = None
+        self.music = music
+        self.tone_cache = {}
+        self.startup = startup
+        self.ready = threading.Event()
+        self.queue = queue.SimpleQueue()
+        # Bytes of effects queued and not yet taken by the audio thread
+        self.backlog = 0
+        self.backlog_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.audio_thread, name='audio', daemon=True)
+        self.thread.start()
+
+    def open_stream(self) -> None:
+        try:
+            import pyaudio
+            self.pyaudio_instance = pyaudio.PyAudio()
+            self.stream = self.pyaudio_instance.open(
+                format=pyaudio.paFloat32,
+                channels=1,
+                rate=SAMPLE_RATE,
+                output=True
+            )
+        except Exception as e:
+            print(f"Failed to initialize PyAudio stream: {e}")
+            self.stream = None
+
+    def audio_thread(self) -> None:
+        self.open_stream()
+        if self.startup:
+            self.startup.mark('audio backend ready' if self.stream else 'audio backend unavailable')
+        if not self.stream:
+            return
+        self.preload(self.EFFECT_TONES)
+        self.ready.set()
+        if self.music:
+            try:
+                import numpy
+            except ImportError as e:
+                print(f"Music disabled: {e}")
+            else:
+                self.mix_loop(numpy)
+                return
+        while True:
+            wave_data = self.queue.get()
+            if wave_data is None:
+                break
+            self.taken(wave_data)
+            try:
+                self.stream.write(wave_data)
+            except Exception as e:
+                print(f"Error playing tone: {e}")
+
+    def mix_loop(self, np) -> None:
+        # Effects keep their queue order, one after another, summed over the music
+        from dkengine.music import MusicSynth
+        synth = MusicSynth(np, self.music)
+        effect = None
+        pos = 0
+        for chunk in synth.chunks():
+            filled = 0
+            while filled < len(chunk):
+                if effect is None:
+                    try:
+                        wave_data = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if wave_data is None:
+                        return
+                    self.taken(wave_data)
+                    effect = np.frombuffer(wave_data, dtype=np.float32)
+                    pos = 0
+                n = min(len(chunk) - filled, len(effect) - pos)
+                chunk[filled:filled + n] += effect[pos:pos + n]
+                filled += n
+                pos += n
+                if pos == len(effect):
+                    effect = None
+            np.clip(chunk, -1.0, 1.0, out=chunk)
+            try:
+                self.stream.write(chunk.tobytes())
+            except Exception as e:
+                print(f"Error playing music: {e}")
+                return
+            if synth.tune != self.music:
+                synth.start(self.music)
+
+    # (frequency, duration_ms, volume) for every effect, so stages can warm the cache
+    EFFECT_TONES = [
+        (660, 80, 0.05), (220, 50, 0.05), (150, 150, 0.08),
+        (100, 300, 0.1), (80, 200, 0.1),
+        (880, 100, 0.07), (1046, 100, 0.07), (1318, 150, 0.07),
+        (440, 30, 0.03),
+    ]
+
+    def render_tone(self, frequency: float, duration_ms: int, volume: float = 0.1) -> bytes:
+        key = (frequency, duration_ms, volume)
+        wave_data = self.tone_cache.get(key)
+        if wave_data is None:
+            sample_rate = SAMPLE_RATE
+            num_samples = int(sample_rate * duration_ms / 1000.0)
+            step = 2 * math.pi * frequency / sample_rate
+            wave_data = array('f', [volume * math.sin(step * i) for i in range(num_samples)]).tobytes()
+            self.tone_cache[key] = wave_data
+        return wave_data
+
+    def preload(self, tones) -> None:
+        for frequency, duration_ms, volume in tones:
+            self.render_tone(frequency, duration_ms, volume)
+
+    def play_tone(self, frequency: float, duration_ms: int, volume: float = 0.1) -> None:
+        self.play_sound((frequency, duration_ms, volume))
+
+    def play_sound(self, *tones) -> None:
+        # One sound event of one or more (frequency, duration_ms, volume) tones. The backlog
+        # cap is checked once per event, so a jingle is queued whole or not at all
+        if not self.ready.is_set():
+            return
+        waves = [self.render_tone(*tone) for tone in tones]
+        with self.backlog_lock:
+            if self.backlog > MAX_BACKLOG_BYTES:
+                return
+            self.backlog += sum(len(wave_data) for wave_data in waves)
+        for wave_data in waves:
+            self.queue.put(wave_data)
+
+    def taken(self, wave_data) -> None:
+        with self.backlog_lock:
+            self.backlog -= len(wave_data)
+
+    def play_music(self, tune) -> None:
+        # Only switches tunes; the engine was created with or without music
+        if self.music:
+            self.music = tune
+
+    def play_jump_sound(self) -> None:
+        self.play_tone(frequency=660, duration_ms=80, volume=0.05)
+
+    def play_land_sound(self) -> None:
+        self.play_tone(frequency=220, duration_ms=50, volume=0.05)
+
+    def play_barrel_break_sound(self) -> None:
+        self.play_tone(frequency=150, duration_ms=150, volume=0.08)
+
+    def play_mario_hit_sound(self) -> None:
+        self.play_sound((100, 300, 0.1), (80, 200, 0.1))
+
+    def play_win_sound(self) -> None:
+        self.play_sound((880, 100, 0.07), (1046, 100, 0.07), (1318, 150, 0.07))
+
+    def play_climb_sound(self) -> None:
+        self.play_tone(frequency=440, duration_ms=30, volume=0.03)
+
+    def cleanup(self) -> None:
+        if self.ready.is_set():
+            self.queue.put(None)
+            self.thread.join(timeout=1.0)
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+        if hasattr(self, 'pyaudio_instance'):
+            self.pyaudio_instance.terminate()
+
+
+class SilentSound:
+    """Stands in for SoundEngine in builds without audio; nothing is imported or started."""
+
+    EFFECT_TONES = ()
+
+    def preload(self, tones) -> None:
+        pass
+
+    def play_music(self, tune) -> None:
+        pass
+
+    def play_jump_sound(self) -> None:
+        pass
+
+    def play_land_sound(self) -> None:
+        pass
+
+    def play_barrel_break_sound(self) -> None:
+        pass
+
+    def play_mario_hit_sound(self) -> None:
+        pass
+
+    def play_win_sound(self) -> None:
+        pass
+
+    def play_climb_sound(self) -> None:
+        pass
+
+    def cleanup(self) -> None:
+        pass
@@ -0,0 +1,286 @@
+import pygame
+
+
+# Pixel maps, one character per pixel; '.' is transparent and every other
+# character is looked up in the palette passed to build_atlas(). Each map sits
+# horizontally centred and bottom-aligned in its entity's box, so the atlas
+# frame has the same size as the rect the simulation moves around.
+MARIO_STAND = [
+    "...RRRRR....",
+    "..RRRRRRRRR.",
+    "..KKKYYKY...",
+    ".KYKYYYKYYY.",
+    ".KYKKYYYKYYY",
+    ".KKYYYYKKKK.",
+    "...YYYYYYY..",
+    "..RRbRRR....",
+    ".RRRbRRbRRR.",
+    "RRRRbbbbRRRR",
+    "YYRbYbbYbRYY",
+    "YYYbbbbbbYYY",
+    "YYbbbbbbbbYY",
+    "..bbb..bbb..",
+    ".KKK....KKK.",
+    "KKKK....KKKK",
+]
+
+MARIO_WALK = [
+    "...RRRRR....",
+    "..RRRRRRRRR.",
+    "..KKKYYKY...",
+    ".KYKYYYKYYY.",
+    ".KYKKYYYKYYY",
+    ".KKYYYYKKKK.",
+    "...YYYYYYY..",
+    "..RRRRbRR...",
+    ".YRRRRbbRRY.",
+    "YYYRRbbbbYYY",
+    "YY.bbbbbbbYY",
+    "...bbbbbbb..",
+    "..bbbb.bbb..",
+    ".KKK...bbb..",
+    "KKKK....KKK.",
+    ".........KK.",
+]
+
+MARIO_CLIMB = [
+    "...RRRRR....",
+    "..RRRRRRR...",
+    "..KKKKKKK...",
+    ".KKKKKKKKK..",
+    ".KKKKKKKKK..",
+    "..KKKKKKK...",
+    "Y..RRRRR...Y",
+    "YRRRbRbRRRRY",
+    ".RRRbRbRRR..",
+    "..RRbbbbR...",
+    "..bbbbbbb...",
+    "..bbbbbbb...",
+    "..bbb.bbb...",
+    "..bbb.bbb...",
+    "..KKK.KKK...",
+    "..KKK.KKK...",
+]
+
+BARREL = [
+    "....DDDDDDDD....",
+    "..DDBBBBBBBBDD..",
+    ".DBKBBBBBBBBBBD.",
+    ".DBBBBYYYYBBBBD.",
+    "DBBBBYBBBBYBBBBD",
+    "DBBBYBBBBBBYBBBD",
+    "DDDDYDDDDDDYDDDD",
+    "DBBBYBBBBBBYBBBD",
+    "DBBBYBBBBBBYBBBD",
+    "DDDDYDDDDDDYDDDD",
+    "DBBBYBBBBBBYBBBD",
+    "DBBBBYBBBBYBBBBD",
+    ".DBBBBYYYYBBBBD.",
+    ".DBBBBBBBBBBBBD.",
+    "..DDBBBBBBBBDD..",
+    "....DDDDDDDD....",
+]
+
+DK = [
+    "..........DDDDDDDD..........",
+    "........DDDDDDDDDDDD........",
+    ".......DDDDDDDDDDDDDD.......",
+    "......DDDYYYDDDDYYYDDD......",
+    "......DDYKKYYYYYYKKYDD......",
+    "......DDYKWYYYYYYWKYDD......",
+    ".....DDDYYYYYYYYYYYYDDD.....",
+    ".....DDYYYYKYYYYKYYYYDD.....",
+    ".....DDYYYYYYYYYYYYYYDD.....",
+    "......DYYWWWWWWWWWWYYD......",
+    "......DDYYYYYYYYYYYYDD......",
+    "....DDDDDDYYYYYYYYDDDDDD....",
+    "..DDDDDDDDDDDDDDDDDDDDDDDD..",
+    ".DDDDDDDDYYYYYYYYYYDDDDDDDD.",
+    "DDDDDDDDYYYYYYYYYYYYDDDDDDDD",
+    "DDDDDDDYYYYYYYYYYYYYYDDDDDDD",
+    "DDDDDDDYYYYYDDDDYYYYYDDDDDDD",
+    "DDDD.DDYYYYYDDDDYYYYYDD.DDDD",
+    "DDDD.DDDYYYYYYYYYYYYDDD.DDDD",
+    "YYYY.DDDDYYYYYYYYYYDDDD.YYYY",
+    "YYYY..DDDDDDDDDDDDDDDD..YYYY",
+    "......DDDDDDDDDDDDDDDD......",
+    ".....DDDDDDD....DDDDDDD.....",
+    "....DDDDDDD......DDDDDDD....",
+    "...YYYYYYY........YYYYYYY...",
+    "...YYYYYYY........YYYYYYY...",
+]
+
+DK_THROW = [
+    "YYYY......DDDDDDDD......YYYY",
+    "YYYY....DDDDDDDDDDDD....YYYY",
+    "DDDD...DDDDDDDDDDDDDD...DDDD",
+    "DDDD..DDDYYYDDDDYYYDDD..DDDD",
+    "DDDD..DDYKKYYYYYYKKYDD..DDDD",
+    ".DDDD.DDYKWYYYYYYWKYDD.DDDD.",
+    "..DDDDDDYYYYYYYYYYYYDDDDDD..",
+    "...DDDDYYYYKYYYYKYYYYDDDD...",
+    ".....DDYYYYYYYYYYYYYYDD.....",
+    "......DYYWWWWWWWWWWYYD......",
+    "......DDYYYYYYYYYYYYDD......",
+    "......DDDDYYYYYYYYDDDD......",
+    ".....DDDDDDDDDDDDDDDDDD.....",
+    "....DDDDDYYYYYYYYYYDDDDD....",
+    "....DDDDYYYYYYYYYYYYDDDD....",
+    "....DDDYYYYYYYYYYYYYYDDD....",
+    "....DDDYYYYYDDDDYYYYYDDD....",
+    "....DDDYYYYYDDDDYYYYYDDD....",
+    "....DDDDYYYYYYYYYYYYDDDD....",
+    "....DDDDDYYYYYYYYYYDDDDD....",
+    "......DDDDDDDDDDDDDDDD......",
+    "......DDDDDDDDDDDDDDDD......",
+    ".....DDDDDDD....DDDDDDD.....",
+    "....DDDDDDD......DDDDDDD....",
+    "...YYYYYYY........YYYYYYY...",
+    "...YYYYYYY........YYYYYYY...",
+]
+
+PAULINE = [
+    "...KKKKK....",
+    "..KKKKKKK...",
+    ".KKYYYYYKK..",
+    ".KYKYYKYYK..",
+    ".KYYYYYYYK..",
+    ".KKYYRRYKK..",
+    "KKK.YYYY.KK.",
+    "KK.PPPPPP.K.",
+    "K.PPWPPWPP..",
+    "..PPPPPPPP..",
+    ".YPPPPPPPPY.",
+    ".Y.PPPPPP.Y.",
+    "...PPPPPP...",
+    "..PPPPPPPP..",
+    "..PPPPPPPP..",
+    ".PPPPPPPPPP.",
+    ".PPPPPPPPPP.",
+    "PPPPPPPPPPPP",
+    "PPPPPPPPPPPP",
+    "...YY..YY...",
+    "...KK..KK...",
+    "..KKK..KKK..",
+]
+
+
+def mirror(rows):
+    return [row[::-1] for row in rows]
+
+
+def rotate(rows):
+    # A quarter turn clockwise; exact, so rolling frames stay pixel art
+    height = len(rows)
+    return [''.join(rows[height - 1 - y][x] for y in range(height)) for x in range(len(rows[0]))]
+
+
+def _turns(rows, n):
+    for _ in range(n):
+        rows = rotate(rows)
+    return rows
+
+
+# Rolling right turns the barrel clockwise; frame = (x // 4) % 4 so rolling left
+# plays the same frames backwards
+BARREL_FRAMES = ('barrel_0', 'barrel_1', 'barrel_2', 'barrel_3')
+MARIO_POSES = {1: ('mario_stand_r', 'mario_walk_r'), -1: ('mario_stand_l', 'mario_walk_l')}
+MARIO_CLIMB_FRAMES = ('mario_climb_0', 'mario_climb_1')
+# Every pose the player takes, numbered by position for saved states and hashes
+PLAYER_POSES = MARIO_POSES[1] + MARIO_POSES[-1] + MARIO_CLIMB_FRAMES
+PAULINE_FRAMES = ('pauline_0', 'pauline_1')
+
+# name: (box width, box height, pixel map); boxes match PLAYER_SIZE, BARREL_SIZE
+# and the dk/goal rects in the level files
+FRAMES = {
+    'mario_stand_r': (20, 20, MARIO_STAND),
+    'mario_walk_r': (20, 20, MARIO_WALK),
+    'mario_stand_l': (20, 20, mirror(MARIO_STAND)),
+    'mario_walk_l': (20, 20, mirror(MARIO_WALK)),
+    'mario_climb_0': (20, 20, MARIO_CLIMB),
+    'mario_climb_1': (20, 20, mirror(MARIO_CLIMB)),
+    'dk': (32, 32, DK),
+    'dk_throw': (32, 32, DK_THROW),
+    'pauline_0': (20, 24, PAULINE),
+    'pauline_1': (20, 24, mirror(PAULINE)),
+}
+for _i, _name in enumerate(BARREL_FRAMES):
+    FRAMES[_name] = (16, 16, _turns(BARREL, _i))
+
+COLORKEY = (255, 0, 255)
+
+
+def layout(frames=FRAMES):
+    # Frames packed left to right in one strip: {name: (x, y, w, h)}
+    areas = {}
+    x = 0
+    for name, (w, h, _rows) in frames.items():
+        areas[name] = (x, 0, w, h)
+        x += w
+    return areas
+
+
+class Atlas:
+    """Every sprite frame pre-rendered into one converted, colour-keyed Surface.
+
+    Each frame also gets a collision mask of its opaque pixels, built once here.
+    """
+
+    def __init__(self, surface, areas):
+        self.surface = surface
+        self.frames = {name: pygame.Rect(area) for name, area in areas.items()}
+        self.masks = {name: pygame.mask.from_surface(surface.subsurface(rect))
+                      for name, rect in self.frames.items()}
+
+    def half_res(self):
+        size = self.surface.get_size()
+        surface = pygame.transform.scale(self.surface, (size[0] // 2, size[1] // 2))
+        surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        areas = {name: (r.x // 2, r.y // 2, r.width // 2, r.height // 2) for name, r in self.frames.items()}
+        return Atlas(surface, areas)
+
+
+def build_atlas(palette, format_surface, frames=FRAMES):
+    areas = layout(frames)
+    width = sum(w for w, _h, _rows in frames.values())
+    height = max(h for _w, h, _rows in frames.values())
+    surface = pygame.Surface((width, height), 0, format_surface)
+    surface.fill(COLORKEY)
+    for name, (w, h, rows) in frames.items():
+        x0, y0 = areas[name][:2]
+        x0 += (w - len(rows[0])) // 2
+        y0 += h - len(rows)
+        for y, row in enumerate(rows):
+            for x, ch in enumerate(row):
+                if ch != '.':
+                    surface.set_at((x0 + x, y0 + y), palette[ch])
+    surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return Atlas(surface, areas)
+
+
+class SpriteBatch:
+    """(atlas, dest, area) entries reused across frames and drawn with one Surface.blits()."""
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.pool = []
+        self.items = []
+
+    def clear(self) -> None:
+        del self.items[:]
+
+    def add(self, name, x, y) -> None:
+        items = self.items
+        pool = self.pool
+        n = len(items)
+        if n == len(pool):
+            pool.append([self.atlas.surface, pygame.Rect(0, 0, 0, 0), None])
+        entry = pool[n]
+        dest = entry[1]
+        dest.x = x
+        dest.y = y
+        entry[2] = self.atlas.frames[name]
+        items.append(entry)
+
+    def draw(self, target) -> None:
+        target.blits(self.items, doreturn=False)
@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from .level import load_level, make_ladders, make_platforms
+from .sweep import time_of_impact
+
+STAGES = ['girders', 'conveyors', 'elevators', 'rivets', 'tower']
+
+
+class RectIndex:
+    """Uniform grid over a list of rects so collision only visits nearby cells."""
+
+    def __init__(self, rects, cell_size=64, cells=None):
+        self.rects = rects
+        self.cell_size = cell_size
+        if cells is None:
+            cells = {}
+            for i, rect in enumerate(rects):
+                for cell in self._cells_for(rect):
+                    cells.setdefault(cell, []).append(i)
+        # Integer cell keys so per-frame lookups don't build (cx, cy) tuples
+        self.cells = {_cell_key(cx, cy): bucket for (cx, cy), bucket in cells.items()}
+        self.swept = pygame.Rect(0, 0, 0, 0)
+
+    def _cells_for(self, rect):
+        size = self.cell_size
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                yield (cx, cy)
+
+    def query_indices(self, rect):
+        return self.query_into(rect, [])
+
+    def query_into(self, rect, out):
+        # Fills and returns `out` with candidate indices in list order, allocation-free
+        del out[:]
+        size = self.cell_size
+        cells = self.cells
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                bucket = cells.get(_cell_key(cx, cy))
+                if bucket:
+                    for i in bucket:
+                        if i not in out:
+                            out.append(i)
+        # Keep the original list order so overlapping resolutions match the full scan
+        out.sort()
+        return out
+
+    def query(self, rect):
+        return [self.rects[i] for i in self.query_indices(rect)]
+
+    def sweep(self, rect, dx, dy, out):
+        # Earliest (t, axis, index) hit moving rect by (dx, dy), or None. Only the cells
+        # under the swept bounds are visited, so a long move costs one query, not substeps.
+        swept = self.swept
+        swept.update(rect.x + min(dx, 0), rect.y + min(dy, 0), rect.width + abs(dx), rect.height + abs(dy))
+        best = None
+        rects = self.rects
+        for i in self.query_into(swept, out):
+            hit = time_of_impact(rect, dx, dy, rects[i])
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = (hit[0], hit[1], i)
+        return best
+
+    def collides(self, rect) -> bool:
+        size = self.cell_size
+        cells = self.cells
+        rects = self.rects
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                bucket = cells.get(_cell_key(cx, cy))
+                if bucket:
+                    for i in bucket:
+                        if rect.colliderect(rects[i]):
+                            return True
+        return False
+
+
+def _cell_key(cx, cy):
+    return cy * 4096 + cx
+
+
+class CompiledStage:
+    def __init__(self, index, name, height, platforms, ladders, platform_index, ladder_index,
+                 drop_rows, nav, dk_rect, goal, start, tier_ys):
+        self.index = index
+        self.name = name
+        self.height = height
+        self.platforms = platforms
+        self.ladders = ladders
+        self.platform_index = platform_index
+        self.ladder_index = ladder_index
+        self.drop_rows = drop_rows
+        self.drop_row_ys = [row[0] for row in drop_rows]
+        self.nav = nav
+        self.dk_rect = dk_rect
+        self.goal = goal
+        self.start = start
+        self.tier_ys = tier_ys
+        self.background = None
+
+
+def stage_index(name) -> int:
+    return STAGES.index(name)
+
+
+def build_stage(index, platform_height, ladder_width):
+    index %= len(STAGES)
+    compiled = load_level(STAGES[index], platform_height, ladder_width)
+    platforms = make_platforms(compiled)
+    ladders = make_ladders(compiled)
+
+    return CompiledStage(
+        index,
+        compiled['name'],
+        compiled['height'],
+        platforms,
+        ladders,
+        RectIndex(platforms, compiled['cell_size'], compiled['cells']),
+        RectIndex([ladder['rect'] for ladder in ladders], compiled['cell_size'], compiled['ladder_cells']),
+        compiled['drop_rows'],
+        compiled['nav'],
+        pygame.Rect(compiled['dk']),
+        pygame.Rect(compiled['goal']),
+        compiled['start'],
+        compiled['tier_ys'],
+    )
+
+
+class StagePipeline:
+    """Compiles stages on a worker thread so the swap at STAGE CLEAR costs no frame time."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stage-loader')
+        self.pending = {}
+
+    def preload(self, index) -> None:
+        index %= len(STAGES)
+        if index not in self.pending:
+            self.pending[index] = self.executor.submit(self.loader, index)
+
+    def ready(self, index) -> bool:
+        future = self.pending.get(index % len(STAGES))
+        return future is not None and future.done()
+
+    def take(self, index):
+        future = self.pending.pop(index % len(STAGES), None)
+        if future is None:
+            return self.loader(index % len(STAGES))
+        return future.result()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,26 @@
+import threading
+import time
+
+
+class StartupProfile:
+    """Wall-clock marks from process start, printed by --startup-profile."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self.lock = threading.Lock()
+
+    def mark(self, label) -> None:
+        now = time.perf_counter()
+        with self.lock:
+            self.marks.append((label, now))
+
+    def report(self) -> str:
+        with self.lock:
+            marks = sorted(self.marks, key=lambda m: m[1])
+        lines = []
+        prev = self.t0
+        for label, t in marks:
+            lines.append(f"{(t - self.t0) * 1000:8.1f} ms  (+{(t - prev) * 1000:6.1f})  {label}")
+            prev = t
+        return '\n'.join(lines)
@@ -0,0 +1,137 @@
+"""A rolling hash of the whole simulation state, kept up to date incrementally.
+
+Each barrel contributes the hash() of its (x, y, direction, level, serial)
+tuple, which for ints is the same on any 64-bit CPython 3.8 or later and costs
+a tenth of a Python-level SplitMix64. The barrels' part of the state is the sum
+of those digests modulo 2**64, so it doesn't depend on table row order and a
+barrel that changes only swaps its old digest for a new one. The game marks barrels as it moves, spawns
+and removes them; commit() re-digests just those, which skips the off-screen
+barrels that the LOD leaves alone most frames. The player row and the counters
+(frame, next barrel serial, timers, flags) are cheap and folded in whole, and
+the seed with frame and serial is all of the counter-based RNG's state.
+
+``value`` is the hash of the current frame and ``rolling`` chains every frame's
+value since reset(), so two runs that ever diverged keep differing. full_hash()
+recomputes a frame's value from scratch; verify() checks the incremental value
+against it, and lockstep() compares differently configured games frame by frame.
+"""
+import struct
+
+from dkengine.rng import MASK64, mix64
+from dkengine.sprites import PLAYER_POSES
+
+POSE_IDS = {name: i for i, name in enumerate(PLAYER_POSES)}
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+
+
+def float_bits(value) -> int:
+    return _BITS.unpack(_DOUBLE.pack(value))[0]
+
+
+def frame_value(game, barrel_sum) -> int:
+    players = game.players
+    h = mix64(game.seed & MASK64)
+    for row in range(len(players)):
+        rect = players.collider[row]
+        h = mix64(h ^ ((rect.x & 0xFFFF) | (rect.y & 0xFFFFF) << 16 | players.on_ground[row] << 36
+                       | players.on_ladder[row] << 37 | (players.facing[row] & 3) << 38
+                       | POSE_IDS[players.pose[row]] << 40 | (players.climb_timer[row] & 0xFF) << 48))
+        h = mix64(h ^ float_bits(players.vel_y[row]))
+    h = mix64(h ^ game.frame ^ game.next_barrel_id << 32)
+    h = mix64(h ^ game.barrel_timer ^ game.dk_throw_timer << 16 ^ game.stage_clear_timer << 32
+              ^ game.stage_index << 48 ^ game.game_over << 56 ^ game.win << 57 ^ game.stage_clear_active << 58)
+    h = mix64(h ^ (game.stress_hits & MASK64))
+    return mix64(h ^ barrel_sum)
+
+
+def barrel_sum(game) -> int:
+    barrels = game.barrels
+    return sum(hash((rect.x, rect.y, direction, level, serial))
+               for rect, direction, level, serial in zip(barrels.collider, barrels.dir, barrels.level,
+                                                         barrels.serial)) & MASK64
+
+
+def full_hash(game) -> int:
+    # The current frame's value from scratch, for checking the incremental one
+    return frame_value(game, barrel_sum(game))
+
+
+class StateHasher:
+    def __init__(self, game):
+        self.game = game
+        self.dirty = set()
+        self.digests = {}
+        self.barrel_sum = 0
+        self.value = 0
+        self.rolling = 0
+        self.frames = 0
+        self.reset()
+
+    def reset(self) -> None:
+        # Restarts the rolling chain, for a new recording or episode
+        self.clear()
+        barrels = self.game.barrels
+        self.dirty.update(barrels.entity)
+        self.rolling = mix64(self.game.seed & MASK64)
+        self.commit()
+        self.frames = 0
+
+    def clear(self) -> None:
+        # Every barrel is gone, as after reset_level()
+        self.dirty.clear()
+        self.digests.clear()
+        self.barrel_sum = 0
+
+    def remove(self, entity) -> None:
+        self.dirty.discard(entity)
+        digest = self.digests.pop(entity, None)
+        if digest is not None:
+            self.barrel_sum = (self.barrel_sum - digest) & MASK64
+
+    def commit(self) -> int:
+        # Re-digests the barrels marked since the last commit and advances the chain
+        barrels = self.game.barrels
+        rows = barrels.row
+        colliders = barrels.collider
+        dirs = barrels.dir
+        levels = barrels.level
+        serials = barrels.serial
+        digests = self.digests
+        total = self.barrel_sum
+        for entity in self.dirty:
+            row = rows.get(entity)
+            if row is None:
+                continue
+            rect = colliders[row]
+            digest = hash((rect.x, rect.y, dirs[row], levels[row], serials[row]))
+            total += digest - digests.get(entity, 0)
+            digests[entity] = digest
+        self.dirty.clear()
+        self.barrel_sum = total & MASK64
+        self.value = frame_value(self.game, self.barrel_sum)
+        self.rolling = mix64(self.rolling ^ self.value)
+        self.frames += 1
+        return self.value
+
+    def verify(self) -> bool:
+        return self.value == full_hash(self.game)
+
+    def report(self) -> str:
+        return f"state hash: {self.rolling:016x} after {self.frames} frames"
+
+
+def lockstep(games, inputs):
+    # Steps every game with the same input words; returns the first frame whose state
+    # hashes differ, or None if they agree throughout
+    for game in games:
+        game.hasher.reset()
+    for frame, word in enumerate(inputs):
+        for game in games:
+            game.input.word = word
+            game.update()
+            game.check_restart()
+        value = games[0].hasher.value
+        if any(game.hasher.value != value for game in games[1:]):
+            return frame
+    return None
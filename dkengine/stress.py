@@ -0,0 +1,23 @@
+class ScalingStats:
+    """Per-update simulation time bucketed by live barrel count, printed at exit in stress mode."""
+
+    def __init__(self, bucket_size=250):
+        self.bucket_size = bucket_size
+        self.buckets = {}
+
+    def record(self, barrels, update_ms) -> None:
+        bucket = self.buckets.get(barrels // self.bucket_size)
+        if bucket is None:
+            bucket = self.buckets[barrels // self.bucket_size] = [0, 0.0, 0.0]
+        bucket[0] += 1
+        bucket[1] += update_ms
+        if update_ms > bucket[2]:
+            bucket[2] = update_ms
+
+    def report(self) -> str:
+        lines = [f"{'barrels':>13} {'updates':>7} {'mean ms':>8} {'max ms':>8}"]
+        for key in sorted(self.buckets):
+            count, total, worst = self.buckets[key]
+            low = key * self.bucket_size
+            lines.append(f"{low:>6}-{low + self.bucket_size - 1:<6} {count:>7} {total / count:>8.2f} {worst:>8.2f}")
+        return '\n'.join(lines)
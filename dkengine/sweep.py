@@ -0,0 +1,41 @@
+INF = float('inf')
+
+
+def time_of_impact(rect, dx, dy, other):
+    """Swept AABB test: the fraction of (dx, dy) rect can travel before it overlaps other.
+
+    Returns (t, axis) with 0 <= t < 1 and axis 0 for a side contact or 1 for a
+    top/bottom one, or None if the move stays clear. Touching edges don't count,
+    matching Rect.colliderect(), and rects that already overlap are not reported.
+    """
+    if dx > 0:
+        x_entry = (other.left - rect.right) / dx
+        x_exit = (other.right - rect.left) / dx
+    elif dx < 0:
+        x_entry = (other.right - rect.left) / dx
+        x_exit = (other.left - rect.right) / dx
+    elif rect.right <= other.left or rect.left >= other.right:
+        return None
+    else:
+        x_entry = -INF
+        x_exit = INF
+
+    if dy > 0:
+        y_entry = (other.top - rect.bottom) / dy
+        y_exit = (other.bottom - rect.top) / dy
+    elif dy < 0:
+        y_entry = (other.bottom - rect.top) / dy
+        y_exit = (other.top - rect.bottom) / dy
+    elif rect.bottom <= other.top or rect.top >= other.bottom:
+        return None
+    else:
+        y_entry = -INF
+        y_exit = INF
+
+    if x_entry > y_entry:
+        entry, axis = x_entry, 0
+    else:
+        entry, axis = y_entry, 1
+    if entry < 0 or entry >= 1 or entry >= min(x_exit, y_exit):
+        return None
+    return entry, axis
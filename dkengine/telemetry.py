@@ -0,0 +1,145 @@
+"""Gameplay telemetry: fixed-size binary records in a preallocated ring, written out in batches.
+
+The game thread only packs a record into the ring (or bumps a frame-time
+histogram bin) under a lock; a background thread copies out whatever has
+accumulated every few seconds and appends it to a size-rotated file, the way
+logging's RotatingFileHandler names them: telemetry.bin, telemetry.bin.1, ...
+If the writer falls a whole ring behind, the oldest records are overwritten
+and counted in ``dropped``.
+
+Each file starts with a header (magic, version, record size, session id);
+read_records() yields the records of one file back as tuples.
+"""
+import os
+import struct
+import threading
+import time
+from array import array
+
+
+MAGIC = b'DKTL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')
+# kind, stage, tier, frame, x, y, barrels, value
+RECORD = struct.Struct('<BBHIhiHf')
+
+TELEMETRY_DEATH = 1     # value: seconds since the attempt started; barrels: barrels on screen
+TELEMETRY_WIN = 2       # value: seconds to reach the goal
+TELEMETRY_HIT = 3       # stress mode's non-fatal hits, fields as for a death
+TELEMETRY_FRAME_HIST = 4  # tier: histogram bin (ms), value: frames in that bin since the last flush
+TELEMETRY_NAMES = {TELEMETRY_DEATH: 'death', TELEMETRY_WIN: 'win', TELEMETRY_HIT: 'hit',
+                   TELEMETRY_FRAME_HIST: 'frame ms'}
+
+HIST_BINS = 64  # 1 ms bins; the last one collects everything slower
+
+
+class TelemetryRecorder:
+    def __init__(self, directory, capacity=4096, flush_interval=2.0, max_bytes=1 << 20, backup_count=5,
+                 name='telemetry.bin'):
+        self.path = os.path.join(directory, name)
+        self.capacity = capacity
+        self.ring = bytearray(capacity * RECORD.size)
+        self.head = 0      # records written since start
+        self.tail = 0      # records flushed since start
+        self.dropped = 0
+        self.hist = array('I', [0] * HIST_BINS)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.session = time.time_ns()
+        self.file = None
+        self.written = 0
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.writer_thread, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def record(self, kind, stage, tier, frame, x, y, barrels, value) -> None:
+        with self.lock:
+            if self.head - self.tail == self.capacity:
+                self.tail += 1
+                self.dropped += 1
+            RECORD.pack_into(self.ring, (self.head % self.capacity) * RECORD.size,
+                             kind, stage, tier, frame & 0xFFFFFFFF, x, y, min(barrels, 0xFFFF), value)
+            self.head += 1
+
+    def frame_time(self, ms) -> None:
+        with self.lock:
+            self.hist[min(int(ms), HIST_BINS - 1)] += 1
+
+    def take(self):
+        # The unflushed records as one bytes batch, plus the histogram since the last take
+        size = RECORD.size
+        with self.lock:
+            start = (self.tail % self.capacity) * size
+            end = (self.head % self.capacity) * size
+            count = self.head - self.tail
+            if not count:
+                batch = b''
+            elif start < end:
+                batch = bytes(self.ring[start:end])
+            else:
+                batch = bytes(self.ring[start:]) + bytes(self.ring[:end])
+            self.tail = self.head
+            hist = self.hist
+            self.hist = array('I', [0] * HIST_BINS)
+        return batch, hist
+
+    def flush(self) -> None:
+        batch, hist = self.take()
+        records = [batch] + [RECORD.pack(TELEMETRY_FRAME_HIST, 0, i, 0, 0, 0, 0, count)
+                             for i, count in enumerate(hist) if count]
+        data = b''.join(records)
+        if data:
+            self.write(data)
+
+    def write(self, data) -> None:
+        try:
+            if self.file is not None and self.written + len(data) > self.max_bytes:
+                self.file.close()
+                self.file = None
+            if self.file is None:
+                if os.path.exists(self.path):
+                    # One session per file, so a file left by an earlier run is rotated out too
+                    self.rotate()
+                self.file = open(self.path, 'wb')
+                self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.session))
+                self.written = HEADER.size
+            self.file.write(data)
+            self.file.flush()
+            self.written += len(data)
+        except OSError as e:
+            print(f"Telemetry write failed: {e}")
+
+    def rotate(self) -> None:
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def writer_thread(self) -> None:
+        while not self.stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self.stop.set()
+        self.thread.join(timeout=1.0)
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def report(self) -> str:
+        return f"telemetry: {self.head} records to {self.path}, {self.dropped} dropped"
+
+
+def read_records(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, size, _session = HEADER.unpack_from(data)
+    if magic != MAGIC or size != RECORD.size:
+        raise ValueError(f"{path} is not a version {VERSION} telemetry file")
+    usable = len(data) - (len(data) - HEADER.size) % size
+    yield from RECORD.iter_unpack(memoryview(data)[HEADER.size:usable])
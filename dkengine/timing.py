@@ -0,0 +1,39 @@
+import math
+import time
+from array import array
+
+
+class SampleStats:
+    """Millisecond samples summarised as mean, stdev, p99 and max."""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = array('d')
+
+    def record(self, ms) -> None:
+        self.samples.append(ms)
+
+    def report(self) -> str:
+        n = len(self.samples)
+        if n == 0:
+            return f"{self.name}: no samples"
+        mean = sum(self.samples) / n
+        stdev = math.sqrt(sum((s - mean) ** 2 for s in self.samples) / n)
+        ordered = sorted(self.samples)
+        p99 = ordered[min(n - 1, int(n * 0.99))]
+        return (f"{self.name}: n={n} mean={mean:.2f}ms stdev={stdev:.2f}ms "
+                f"p99={p99:.2f}ms max={ordered[-1]:.2f}ms")
+
+
+class IntervalStats(SampleStats):
+    """Intervals between successive calls to tick(), in milliseconds."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.last = None
+
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if self.last is not None:
+            self.samples.append((now - self.last) * 1000)
+        self.last = now
@@ -0,0 +1,296 @@
+"""Monte Carlo difficulty tuning: how physics and barrel constants change win rate and survival.
+
+Each point of a parameter grid (any of TUNABLE, set per game) is played for
+many headless episodes by a scripted player across a process pool. Episodes
+are handed out in batches; a point stops getting new batches once the Wilson
+score interval of its win rate is narrower than ``ci`` or it reaches
+``max_episodes``. Episode e of every point uses seed base_seed + e, so points
+are compared on the same barrel draws.
+
+    python -m dkengine.tuner --stage girders --set barrel_speed=2,3 --set jump_power=8,10
+"""
+import argparse
+import itertools
+import math
+import os
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from dkengine.input import INPUT_JUMP, INPUT_LEFT, INPUT_RIGHT, INPUT_UP
+from dkengine.rng import STREAM_CLIMBER, stream_key, uniform
+
+# Game attributes a grid point may set, with their types for --set
+TUNABLE = {
+    'barrel_speed': int,
+    'player_speed': int,
+    'jump_power': float,
+    'gravity': float,
+    'spawn_interval': int,
+    'drop_chance': float,
+}
+Z_95 = 1.959964
+# Sub-keys of the Climber's random decisions
+CLIMBER_LADDER = 0
+CLIMBER_PAUSE = 1
+CLIMBER_PAUSE_LENGTH = 2
+CLIMBER_MISS = 3
+
+
+def wilson_interval(wins, n, z=Z_95):
+    if not n:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def nearest_tier(tier_ys, y) -> int:
+    # Index into tier_ys (0 is the top tier) of the tier nearest to y
+    t = bisect_left(tier_ys, y)
+    if t == len(tier_ys) or (t > 0 and y - tier_ys[t - 1] <= tier_ys[t] - y):
+        t -= 1
+    return t
+
+
+class Climber:
+    """Scripted player: climbs ladders up from tier to tier (stage.nav) and on the goal's tier
+    walks to the goal. Standing, it jumps barrels rolling at it, gaps between platforms and the
+    steps of sloped girders that stop it walking.
+
+    A perfect bot plays every seed the same, so like a person it varies per episode, keyed on
+    the game's seed: which ladder up it takes from each tier, the odd pause of up to max_pause
+    frames, and barrels it fails to react to.
+    """
+
+    def __init__(self, jump_distance=36, pause_chance=0.01, max_pause=90, miss_chance=0.1):
+        self.jump_distance = jump_distance
+        self.pause_chance = pause_chance
+        self.max_pause = max_pause
+        self.miss_chance = miss_chance
+        self.ground_tier = 0
+        self.last_x = None
+        self.paused_until = 0
+        self.usable = {}
+
+    def __call__(self, game) -> int:
+        players = game.players
+        player = players.collider[0]
+        tier_ys = game.tier_ys
+        seed = game.seed
+        frame = game.frame
+        if frame == 0:
+            # A new episode
+            self.paused_until = 0
+            self.last_x = None
+        # Standing, or resting on a ladder's top with feet on the platform it passed through
+        standing = players.on_ground[0] or (players.on_ladder[0] and not game.platform_index.collides(player)
+                                            and game.platform_index.collides(player.move(0, 1)))
+        if standing:
+            self.ground_tier = nearest_tier(tier_ys, player.bottom)
+        # Mid-climb the tier climbed from still picks the ladder
+        t = self.ground_tier
+        if t == 0 or nearest_tier(tier_ys, game.goal.bottom) == t:
+            target = game.goal.centerx
+        else:
+            ladders = game.ladders
+            up = [ladders[i]['rect'] for other, i in game.nav[t] if other < t and self.leads_up(game, i)]
+            if not up:
+                return 0
+            ladder = up[int(uniform(seed, 0, t, stream_key(STREAM_CLIMBER, CLIMBER_LADDER)) * len(up))]
+            target = ladder.centerx
+            if players.on_ladder[0] and abs(target - player.centerx) <= game.player_speed // 2 + 1:
+                if player.bottom > ladder.top + game.player_speed or game.platform_index.collides(player):
+                    return INPUT_UP
+                # At the top, clear of the platform (some tops stand above it): on to the next ladder
+                self.ground_tier = nearest_tier(tier_ys, player.bottom)
+                return 0
+        if standing and frame >= self.paused_until and not players.on_ladder[0]:
+            if uniform(seed, frame, 0, stream_key(STREAM_CLIMBER, CLIMBER_PAUSE)) < self.pause_chance:
+                self.paused_until = frame + 1 + int(
+                    uniform(seed, frame, 0, stream_key(STREAM_CLIMBER, CLIMBER_PAUSE_LENGTH)) * self.max_pause)
+        dx = target - player.centerx if frame >= self.paused_until else 0
+        word = INPUT_RIGHT if dx > 0 else INPUT_LEFT if dx < 0 else 0
+        if word and player.x == self.last_x and (standing or players.on_ladder[0]):
+            # Stopped by a step: hop it, or on a ladder, where jumping is disabled, climb over it
+            word |= INPUT_UP | INPUT_JUMP
+        elif standing and abs(dx) > player.width and not game.platform_index.collides(
+                player.move(player.width if dx > 0 else -player.width, 1)):
+            # A gap between platforms ahead, with the target beyond it
+            word |= INPUT_JUMP
+        elif standing and self.barrel_near(game, player):
+            word |= INPUT_JUMP
+        self.last_x = player.x
+        return word
+
+    def leads_up(self, game, i) -> bool:
+        # Some ladders on sloped girders end short of the platform above; climbing those gets nowhere
+        key = (game.stage_index, i)
+        usable = self.usable.get(key)
+        if usable is None:
+            ladder = game.ladders[i]
+            top = ladder['rect'].copy()
+            top.top -= 4
+            top.height = 20
+            usable = self.usable[key] = not ladder['broken'] and game.platform_index.collides(top)
+        return usable
+
+    def barrel_near(self, game, player) -> bool:
+        barrels = game.barrels
+        for rect in game.broadphase.query(player.inflate(2 * self.jump_distance, 0)):
+            if abs(rect.bottom - player.bottom) < 12:
+                row = barrels.row[rect.entity]
+                if ((rect.centerx - player.centerx) * barrels.dir[row] < 0
+                        and uniform(game.seed, 0, barrels.serial[row],
+                                    stream_key(STREAM_CLIMBER, CLIMBER_MISS)) >= self.miss_chance):
+                    return True
+        return False
+
+
+def play_episode(game, player, seed, max_frames):
+    # Returns (won, frames survived, highest tier reached counted up from the bottom)
+    game.seed = seed
+    game.frame = 0
+    game.next_barrel_id = 0
+    game.reset_level()
+    latch = game.input
+    best_tier = 0
+    for frame in range(1, max_frames + 1):
+        latch.word = player(game)
+        game.update()
+        if game.win:
+            return True, frame, len(game.tier_ys) - 1
+        if game.game_over:
+            return False, frame, best_tier
+        if frame % 16 == 0:
+            best_tier = max(best_tier, game.tier_at(game.players.collider[0].bottom))
+    return False, max_frames, best_tier
+
+
+_games = {}
+
+
+def run_batch(profile, stage, params, seeds, max_frames):
+    # Runs in a pool worker; one headless game per (profile, stage) is kept for the worker's lifetime
+    from dkengine.game import DonkeyKongGame
+    game = _games.get((profile, stage))
+    if game is None:
+        game = _games[profile, stage] = DonkeyKongGame(profile, stage=stage, gc_schedule=False, seed=0,
+                                                       music=False, headless=True)
+    defaults = {name: getattr(game, name) for name in params}
+    for name, value in params.items():
+        setattr(game, name, value)
+    player = Climber()
+    try:
+        return [play_episode(game, player, seed, max_frames) for seed in seeds]
+    finally:
+        for name, value in defaults.items():
+            setattr(game, name, value)
+
+
+class PointStats:
+    def __init__(self, params):
+        self.params = params
+        self.results = []
+        self.submitted = 0
+        self.done = False
+
+    def add(self, results) -> None:
+        self.results.extend(results)
+
+    @property
+    def wins(self) -> int:
+        return sum(1 for won, _frames, _tier in self.results if won)
+
+    def interval(self):
+        return wilson_interval(self.wins, len(self.results))
+
+    def report(self, fps) -> str:
+        n = len(self.results)
+        low, high = self.interval()
+        survival = sorted(frames for _won, frames, _tier in self.results)
+        pct = [survival[min(n - 1, int(q * n))] / fps for q in (0.1, 0.5, 0.9)] if n else [0.0] * 3
+        tier = sum(t for _won, _frames, t in self.results) / n if n else 0.0
+        name = ' '.join(f'{k}={v}' for k, v in self.params.items()) or 'defaults'
+        return (f"{name}: {n} episodes, win {self.wins / max(1, n):.3f} [{low:.3f}, {high:.3f}], "
+                f"survival p10/p50/p90 {pct[0]:.1f}/{pct[1]:.1f}/{pct[2]:.1f}s, mean tier {tier:.2f}")
+
+
+def tune(grid, profile='nes', stage=0, max_episodes=2000, batch=50, ci=0.05, max_frames=60 * 120,
+         processes=None, base_seed=0, progress=None):
+    # grid: list of {attribute: value} points; returns their PointStats in grid order
+    points = [PointStats(params) for params in grid]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        running = {}
+
+        def submit(point) -> bool:
+            if point.done or point.submitted >= max_episodes:
+                return False
+            count = min(batch, max_episodes - point.submitted)
+            seeds = range(base_seed + point.submitted, base_seed + point.submitted + count)
+            running[pool.submit(run_batch, profile, stage, point.params, seeds, max_frames)] = point
+            point.submitted += count
+            return True
+
+        # Two batches in flight per worker keeps the pool busy while results come back
+        slots = 2 * (processes or os.cpu_count() or 1)
+        for point in itertools.islice(itertools.cycle(points), slots):
+            submit(point)
+        while running:
+            finished, _pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                point = running.pop(future)
+                point.add(future.result())
+                if not point.done:
+                    # Batches still in flight when a point stops are kept but not reported again
+                    low, high = point.interval()
+                    point.done = (high - low <= ci and len(point.results) >= batch
+                                  or len(point.results) >= max_episodes)
+                    if point.done and progress:
+                        progress(point)
+                # Refill from whichever points still need episodes, this one first
+                for candidate in [point] + points:
+                    if submit(candidate):
+                        break
+    return points
+
+
+def parse_set(spec):
+    name, _, values = spec.partition('=')
+    if name not in TUNABLE or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=V1,V2,... with NAME one of {', '.join(TUNABLE)}")
+    return name, [TUNABLE[name](v) for v in values.split(',')]
+
+
+def main() -> None:
+    from dkengine.game import FPS
+    from dkengine.profiles import PROFILES
+    from dkengine.stages import STAGES, stage_index
+
+    parser = argparse.ArgumentParser(description="Monte Carlo difficulty tuning over a process pool")
+    parser.add_argument('--profile', choices=PROFILES, default='nes')
+    parser.add_argument('--stage', choices=STAGES, default=STAGES[0])
+    parser.add_argument('--set', type=parse_set, action='append', default=[], metavar='NAME=V1,V2',
+                        help="values to sweep for one of: " + ', '.join(TUNABLE))
+    parser.add_argument('--episodes', type=int, default=2000, help="most episodes per grid point")
+    parser.add_argument('--batch', type=int, default=50, help="episodes per pool task")
+    parser.add_argument('--ci', type=float, default=0.05,
+                        help="stop a point once its 95%% win-rate interval is this narrow")
+    parser.add_argument('--seconds', type=float, default=120, help="episode time limit in game seconds")
+    parser.add_argument('--processes', type=int, default=None, help="pool size (all cores by default)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first episode")
+    args = parser.parse_args()
+
+    names = [name for name, _values in args.set]
+    grid = [dict(zip(names, values)) for values in itertools.product(*(values for _name, values in args.set))]
+    points = tune(grid, args.profile, stage_index(args.stage), args.episodes, args.batch, args.ci,
+                  int(args.seconds * FPS), args.processes, args.seed,
+                  progress=lambda point: print(point.report(FPS), flush=True))
+    print()
+    for point in sorted(points, key=lambda point: -point.wins / max(1, len(point.results))):
+        print(point.report(FPS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+from dkengine.game import DonkeyKongGame
+from dkengine.input import INPUT_DOWN, INPUT_JUMP, INPUT_LEFT, INPUT_RESTART, INPUT_RIGHT, INPUT_UP
+from dkengine.replay import KEYFRAME_INTERVAL, ReplayArchive
+from dkengine.statehash import full_hash
+
+WORDS = (0, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP, INPUT_RESTART)
+FRAMES = KEYFRAME_INTERVAL * 2 + KEYFRAME_INTERVAL // 3
+SEEK_FRAMES = (0, KEYFRAME_INTERVAL - 1, KEYFRAME_INTERVAL, KEYFRAME_INTERVAL + KEYFRAME_INTERVAL // 2, FRAMES)
+
+
+def record_run(path, **kwargs):
+    # Plays FRAMES updates of seeded random input into a replay archive; returns
+    # full_hash after each update count, index 0 being the state before the first
+    game = DonkeyKongGame(seed=7, music=False, headless=True, gc_schedule=False, state_hash=True,
+                          record=path, **kwargs)
+    rng = random.Random(3)
+    hashes = [full_hash(game)]
+    try:
+        for frame in range(FRAMES):
+            if frame % 15 == 0:
+                word = rng.choice(WORDS)
+            game.input.word = word
+            game.update()
+            # The hasher commits at the end of update(); a restart lands after that
+            assert game.hasher.verify(), f"incremental hash drifted at frame {frame + 1}"
+            game.check_restart()
+            hashes.append(full_hash(game))
+    finally:
+        game.close()
+    return hashes
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'stress': True, 'max_barrels': 300}], ids=['normal', 'stress'])
+def test_seek_reproduces_recorded_hash(tmp_path, kwargs):
+    path = str(tmp_path / 'runs.dkr')
+    hashes = record_run(path, **kwargs)
+    with ReplayArchive(path) as archive:
+        assert len(archive) == 1
+        replay = archive[0]
+        assert replay.frames == FRAMES
+        for frame in SEEK_FRAMES:
+            game = replay.new_game()
+            try:
+                replay.seek(game, frame, verify=True)
+                assert full_hash(game) == hashes[frame], f"seek to frame {frame}"
+            finally:
+                game.close()